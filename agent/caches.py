@@ -0,0 +1,181 @@
+"""
+Caching wrappers for agent service clients
+Skips repeated embedding, completion and search calls for identical inputs
+"""
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List
+import hashlib
+import logging
+import os
+import struct
+import threading
+
+try:
+    import redis
+except ImportError:
+    # Persistent embedding cache is optional
+    redis = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def create_redis_client(url: str = None):
+    """Create a Redis client for the shared embedding cache, if configured"""
+    url = url or os.getenv('EMBEDDING_CACHE_REDIS_URL')
+    if not url:
+        return None
+    if redis is None:
+        logger.warning("EMBEDDING_CACHE_REDIS_URL is set but redis is not installed")
+        return None
+    return redis.Redis.from_url(url)
+
+class CachedRetriever:
+    """
+    Two-tier cache in front of NeMoRetrieverClient.embed
+
+    A process-local LRU is backed by an optional Redis store so embeddings
+    survive restarts and are shared between workers. Persisted vectors are
+    stored as float32, as the endpoint produces them, so a Redis hit returns
+    the same vector as a fresh call.
+    """
+
+    def __init__(self, retriever, maxsize: int = 1024, redis_client=None, ttl: int = 86400):
+        self.retriever = retriever
+        self.redis = redis_client
+        self.ttl = ttl
+        self.model = getattr(retriever, 'model', '')
+        self._embed = lru_cache(maxsize=maxsize)(self._embed_persistent)
+
+    def _key(self, text: str) -> bytes:
+        digest = hashlib.sha256(f"{self.model}\0{text}".encode('utf-8')).digest()
+        # Versioned by encoding; earlier float16 entries are simply never read
+        return b"embedding:f32:" + digest
+
+    def _embed_persistent(self, text: str) -> List[float]:
+        if self.redis is None:
+            return self.retriever.embed(text)
+
+        key = self._key(text)
+        try:
+            raw = self.redis.get(key)
+            if raw:
+                vector = array('f')
+                vector.frombytes(raw)
+                return vector.tolist()
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+
+        # Returned exactly as stored, so misses and later hits yield the same vector
+        packed = array('f', self.retriever.embed(text))
+        embedding = packed.tolist()
+
+        try:
+            self.redis.setex(key, self.ttl, packed.tobytes())
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+        return embedding
+
+    def embed(self, text: str) -> List[float]:
+        """Return the cached embedding for text, computing it on a miss"""
+        return self._embed(text)
+
+    def warmup(self, texts: List[str]):
+        """Pre-populate the cache, e.g. with known demo scenarios at startup"""
+        for text in texts:
+            try:
+                self.embed(text)
+            except Exception as e:
+                logger.warning(f"Embedding warmup failed: {e}")
+
+    def __getattr__(self, name):
+        return getattr(self.retriever, name)
+
+class CachedNIM:
+    """LRU cache of NIM completions keyed by a SHA-256 of the request"""
+
+    def __init__(self, nim, maxsize: int = 512):
+        self.nim = nim
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(prompt: str, max_tokens: int, temperature: float) -> bytes:
+        return hashlib.sha256(f"{prompt}|{max_tokens}|{temperature}".encode('utf-8')).digest()
+
+    def generate(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7) -> str:
+        """Generate text completion, serving repeated requests from the cache"""
+        key = self._key(prompt, max_tokens, temperature)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        text = self.nim.generate(prompt, max_tokens=max_tokens, temperature=temperature)
+
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return text
+
+    def __getattr__(self, name):
+        return getattr(self.nim, name)
+
+class CachedVectorStore:
+    """
+    LRU cache of k-NN search results in front of VectorStore.search_similar
+
+    Queries are keyed by their float16-rounded embedding, so vectors differing
+    only in low-order bits share an entry. Inserts through the wrapper clear it.
+    """
+
+    def __init__(self, vector_store, maxsize: int = 10000):
+        self.vector_store = vector_store
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, query_embedding: List[float], top_k: int) -> bytes:
+        packed = struct.pack(f'<{len(query_embedding)}e', *query_embedding)
+        return hashlib.sha256(f"{self.vector_store.index_name}|{top_k}|".encode('utf-8') + packed).digest()
+
+    def search_similar(self, query_embedding: List[float], top_k: int = 10) -> List[Dict]:
+        """Search for similar passages, serving repeated queries from the cache"""
+        key = self._key(query_embedding, top_k)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return list(self._cache[key])
+
+        results = self.vector_store.search_similar(query_embedding, top_k=top_k)
+
+        with self._lock:
+            self._cache[key] = results
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return list(results)
+
+    def invalidate_cache(self):
+        """Drop cached results, e.g. after the index changes"""
+        with self._lock:
+            self._cache.clear()
+
+    def bulk_insert(self, *args, **kwargs):
+        """Insert passages, then clear results that may no longer be current"""
+        try:
+            return self.vector_store.bulk_insert(*args, **kwargs)
+        finally:
+            self.invalidate_cache()
+
+    def __getattr__(self, name):
+        return getattr(self.vector_store, name)
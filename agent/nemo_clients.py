@@ -3,27 +3,45 @@ NeMo Microservices Client Wrappers
 For Retriever, Guardrails, Evaluator, and NIM reasoning
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Optional
 import logging
 import os
-import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _create_session(max_retries: int = 3) -> requests.Session:
+    """Create a pooled HTTP session that retries transient failures with backoff"""
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"]
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=32, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 class GuardrailsClient:
     """NeMo Guardrails client for content moderation"""
     
     def __init__(self, endpoint: str = None, api_key: str = None):
         self.endpoint = endpoint or os.getenv('NEMO_GUARDRAILS_ENDPOINT')
         self.api_key = api_key or os.getenv('NGC_API_KEY')
+        self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.session = _create_session()
     
     def validate_input(self, text: str) -> Dict:
         """Validate input text for safety and content policy"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.endpoint}/validate",
-                headers={"Authorization": f"Bearer {self.api_key}"},
+                headers=self.headers,
                 json={"text": text},
                 timeout=10
             )
@@ -44,13 +62,15 @@ class EvaluatorClient:
     def __init__(self, endpoint: str = None, api_key: str = None):
         self.endpoint = endpoint or os.getenv('NEMO_EVALUATOR_ENDPOINT')
         self.api_key = api_key or os.getenv('NGC_API_KEY')
+        self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.session = _create_session()
     
     def score(self, data: Dict) -> Dict:
         """Score content quality metrics"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.endpoint}/evaluate",
-                headers={"Authorization": f"Bearer {self.api_key}"},
+                headers=self.headers,
                 json=data,
                 timeout=10
             )
@@ -72,36 +92,58 @@ class NIMClient:
         self.endpoint = endpoint or os.getenv('NIM_ENDPOINT')
         self.api_key = api_key or os.getenv('NGC_API_KEY')
         self.max_retries = 3
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        # Retries and backoff are handled by the session's adapter
+        self.session = _create_session(self.max_retries)
     
     def generate(self, prompt: str, max_tokens: int = 1024, temperature: float = 0.7) -> str:
         """Generate text completion using NIM"""
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.post(
-                    f"{self.endpoint}/v1/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "prompt": prompt,
-                        "max_tokens": max_tokens,
-                        "temperature": temperature,
-                        "stop": ["\n\n"]
-                    },
-                    timeout=120
-                )
-                response.raise_for_status()
-                result = response.json()
-                return result['choices'][0]['text']
+        try:
+            response = self.session.post(
+                f"{self.endpoint}/v1/completions",
+                headers=self.headers,
+                json={
+                    "prompt": prompt,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "stop": ["\n\n"]
+                },
+                timeout=120
+            )
+            response.raise_for_status()
+            result = response.json()
+            return result['choices'][0]['text']
+        
+        except Exception as e:
+            logger.error(f"NIM generation error after {self.max_retries} retries: {e}")
+            raise
+    
+    def generate_batch(self, prompts: List[str], max_tokens: int = 1024, temperature: float = 0.7) -> List[str]:
+        """Generate completions for several prompts in a single request"""
+        try:
+            response = self.session.post(
+                f"{self.endpoint}/v1/completions",
+                headers=self.headers,
+                json={
+                    "prompt": prompts,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "stop": ["\n\n"]
+                },
+                timeout=120
+            )
+            response.raise_for_status()
+            choices = response.json()['choices']
+            if len(choices) != len(prompts):
+                raise ValueError(f"Expected {len(prompts)} completions, got {len(choices)}")
             
-            except Exception as e:
-                if attempt == self.max_retries - 1:
-                    logger.error(f"NIM generation error after {self.max_retries} attempts: {e}")
-                    raise
-                wait_time = 2 ** attempt
-                logger.warning(f"NIM request failed, retrying in {wait_time}s...")
-                time.sleep(wait_time)
+            # Choices are not guaranteed to come back in prompt order
+            choices = sorted(choices, key=lambda choice: choice.get('index', 0))
+            return [choice['text'] for choice in choices]
         
-        return ""
-
+        except Exception as e:
+            logger.error(f"NIM batch generation error: {e}")
+            raise
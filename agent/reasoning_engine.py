@@ -2,11 +2,14 @@
 SynthArbiter Multi-Step Reasoning Engine
 Implements the NeMo flywheel for ethical dilemma analysis
 """
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional
 import logging
 import os
+import re
 
+from agent.caches import CachedNIM, CachedRetriever, CachedVectorStore, create_redis_client
 from agent.nemo_clients import GuardrailsClient, EvaluatorClient, NIMClient
 from services.nemo_retriever_client import NeMoRetrieverClient
 from services.opensearch_client import VectorStore
@@ -14,6 +17,60 @@ from services.opensearch_client import VectorStore
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A reasoning step starts at a numbered or bulleted line and runs until the next one.
+# Bullets need trailing whitespace so **bold** openers and --- rules don't start a step.
+_STEP_RE = re.compile(
+    r'^[ \t]*(?:\d+\.|[-*](?=\s))[ \t]*(.+?)(?=^[ \t]*(?:\d+\.|[-*](?=\s))|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+# Markdown horizontal rules, dropped from step text
+_RULE_RE = re.compile(r'^[ \t]*[-*_]{3,}[ \t]*$', re.MULTILINE)
+# Paired emphasis markers, unwrapped to their text. Lone asterisks (2 * 3, *args)
+# and dunder names (__init__) are left alone.
+_EMPHASIS_RES = (
+    re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*', re.DOTALL),
+    re.compile(r'(?<!\w)__(?![A-Za-z_]\w*__(?!\w))(?=\S)(.+?)(?<=\S)__(?!\w)', re.DOTALL),
+    re.compile(r'(?<![\w*])\*(?![\s*])(.+?)(?<![\s*])\*(?![\w*])', re.DOTALL),
+)
+
+def _strip_markup(text: str) -> str:
+    """Remove markdown rules and emphasis from a step, keeping its words"""
+    text = _RULE_RE.sub('', text)
+    for emphasis_re in _EMPHASIS_RES:
+        text = emphasis_re.sub(r'\1', text)
+    return text
+
+# Prompt templates. Retrieved context comes first so repeated contexts share a cacheable prefix.
+_REASONING_PROMPT = """You are an AI ethicist analyzing the following scenario.
+
+Relevant context from academic literature:
+{context}
+
+Use these ethical frameworks: {frameworks}
+
+Scenario:
+{scenario}
+
+Provide a structured ethical analysis with:
+1. Stakeholder identification
+2. Moral trade-offs under each framework
+3. Potential consequences
+4. Synthesized recommendation
+
+Analysis:"""
+
+_SIMULATION_PROMPT = """Given scenario: {scenario}
+And reasoning: {reasoning}
+If we {action}, what are the likely consequences?
+Provide a brief analysis."""
+
+# Evaluation scores for runs with no reasoning or context to score
+_EMPTY_SCORES = {
+    'context_relevance': 0.0,
+    'reasoning_coherence': 0.0,
+    'ethical_coverage': 0.0
+}
+
 @dataclass
 class AgentState:
     """State container for multi-step reasoning"""
@@ -31,9 +88,14 @@ class SynthArbiterAgent:
     def __init__(self):
         self.guardrails = GuardrailsClient()
         self.evaluator = EvaluatorClient()
-        self.nim = NIMClient()
-        self.retriever = NeMoRetrieverClient()
-        self.vector_store = VectorStore()
+        self.nim = CachedNIM(NIMClient())
+        self.retriever = CachedRetriever(NeMoRetrieverClient(), redis_client=create_redis_client())
+        self.vector_store = CachedVectorStore(VectorStore.from_cached())
+    
+    def warmup(self, scenarios: List[str]):
+        """Pre-populate the embedding cache with known scenarios"""
+        logger.info(f"Warming embedding cache with {len(scenarios)} scenarios")
+        self.retriever.warmup(scenarios)
     
     def run(self, scenario: str, frameworks: List[str] = None) -> AgentState:
         """
@@ -71,26 +133,17 @@ class SynthArbiterAgent:
         
         # Step 3: NIM - Ethical Reasoning
         logger.info("Step 3: Generating ethical reasoning")
-        context_text = "\n\n".join([doc['text'] for doc in state.retrieved_context[:5]])
+        # Order passages deterministically so repeated contexts produce identical prompt prefixes
+        top_context = sorted(state.retrieved_context[:5], key=lambda doc: str(doc.get('id', doc['text'])))
+        context_text = "\n\n".join(doc['text'] for doc in top_context)
         
-        frameworks_str = ", ".join(frameworks)
-        prompt = f"""You are an AI ethicist analyzing the following scenario. 
-Use these ethical frameworks: {frameworks_str}
-
-Relevant context from academic literature:
-{context_text}
-
-Scenario:
-{scenario}
-
-Provide a structured ethical analysis with:
-1. Stakeholder identification
-2. Moral trade-offs under each framework
-3. Potential consequences
-4. Synthesized recommendation
-
-Analysis:"""
+        prompt = _REASONING_PROMPT.format(
+            context=context_text,
+            frameworks=", ".join(sorted(frameworks)),
+            scenario=scenario
+        )
         
+        reasoning_response = ""
         try:
             reasoning_response = self.nim.generate(prompt, max_tokens=1024, temperature=0.7)
             state.reasoning_steps = self._parse_reasoning_steps(reasoning_response)
@@ -98,23 +151,31 @@ Analysis:"""
             logger.error(f"Reasoning generation error: {e}")
             state.reasoning_steps = ["Reasoning generation failed"]
         
-        # Step 4: Simulation - Counterfactual Analysis
-        logger.info("Step 4: Simulating outcomes")
-        state.simulated_outcomes = self._simulate_outcomes(scenario, state.reasoning_steps)
-        
-        # Step 5: Guardrails - Output Validation
-        logger.info("Step 5: Validating output with Guardrails")
-        output_text = "\n".join(state.reasoning_steps)
-        output_check = self.guardrails.validate_output(output_text)
-        state.guardrail_checks['output'] = output_check
-        
-        # Step 6: Evaluator - Quality Assessment
-        logger.info("Step 6: Evaluating reasoning quality")
-        state.evaluation_scores = self.evaluator.score({
-            'context_relevance': self._check_relevance(state.retrieved_context),
-            'reasoning_coherence': reasoning_response if reasoning_response else "",
-            'ethical_coverage': self._check_framework_coverage(frameworks)
-        })
+        # Steps 4-6 only depend on the reasoning output, so run them concurrently
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            # Step 4: Simulation - Counterfactual Analysis
+            logger.info("Step 4: Simulating outcomes")
+            outcomes_future = executor.submit(self._simulate_outcomes, scenario, state.reasoning_steps)
+            
+            # Step 5: Guardrails - Output Validation
+            logger.info("Step 5: Validating output with Guardrails")
+            output_text = "\n".join(state.reasoning_steps)
+            output_check_future = executor.submit(self.guardrails.validate_output, output_text)
+            
+            # Step 6: Evaluator - Quality Assessment
+            logger.info("Step 6: Evaluating reasoning quality")
+            scores_future = None
+            # Skip the evaluator round trip when there is nothing meaningful to score
+            if reasoning_response and state.retrieved_context:
+                scores_future = executor.submit(self.evaluator.score, {
+                    'context_relevance': self._check_relevance(state.retrieved_context),
+                    'reasoning_coherence': reasoning_response,
+                    'ethical_coverage': self._check_framework_coverage(frameworks)
+                })
+            
+            state.simulated_outcomes = outcomes_future.result()
+            state.guardrail_checks['output'] = output_check_future.result()
+            state.evaluation_scores = scores_future.result() if scores_future else dict(_EMPTY_SCORES)
         
         # Step 7: Synthesis - Final Recommendation
         logger.info("Step 7: Synthesizing recommendation")
@@ -124,22 +185,9 @@ Analysis:"""
     
     def _parse_reasoning_steps(self, response: str) -> List[str]:
         """Parse NIM response into structured reasoning steps"""
-        # Simple parsing by numbered/bullet points
-        steps = []
-        lines = response.split('\n')
-        current_step = ""
-        
-        for line in lines:
-            line = line.strip()
-            if line and (line.startswith('1.') or line.startswith('-') or line.startswith('*')):
-                if current_step:
-                    steps.append(current_step)
-                current_step = line.lstrip('123456789.-* ').strip()
-            elif line and current_step:
-                current_step += " " + line
-        
-        if current_step:
-            steps.append(current_step)
+        # Split on numbered/bullet points, folding continuation lines into their step
+        steps = [' '.join(_strip_markup(match.group(1)).split()) for match in _STEP_RE.finditer(response)]
+        steps = [step for step in steps if step]
         
         # Default fallback
         if not steps:
@@ -149,27 +197,44 @@ Analysis:"""
     
     def _simulate_outcomes(self, scenario: str, reasoning_steps: List[str]) -> List[Dict]:
         """Generate counterfactual outcomes"""
-        outcomes = []
         actions = ['grant_rights', 'deny_rights', 'conditional_rights']
+        reasoning = reasoning_steps[0] if reasoning_steps else "General analysis"
+        prompts = [
+            _SIMULATION_PROMPT.format(
+                scenario=scenario,
+                reasoning=reasoning,
+                action=action.replace('_', ' ')
+            )
+            for action in actions
+        ]
         
-        for action in actions:
+        # Send all counterfactual prompts in one round-trip when the endpoint supports it
+        try:
+            texts = self.nim.generate_batch(prompts, max_tokens=256, temperature=0.8)
+            return [
+                {'action': action, 'consequences': text}
+                for action, text in zip(actions, texts)
+            ]
+        except Exception as e:
+            logger.warning(f"Batch simulation failed, falling back to per-action calls: {e}")
+        
+        def simulate(action: str, prompt: str) -> Dict:
             try:
-                prompt = f"""Given scenario: {scenario}
-And reasoning: {reasoning_steps[0] if reasoning_steps else "General analysis"}
-If we {action.replace('_', ' ')}, what are the likely consequences?
-Provide a brief analysis."""
-                
                 consequence_text = self.nim.generate(prompt, max_tokens=256, temperature=0.8)
-                outcomes.append({
+                return {
                     'action': action,
                     'consequences': consequence_text
-                })
+                }
             except Exception as e:
                 logger.error(f"Simulation error for {action}: {e}")
-                outcomes.append({
+                return {
                     'action': action,
                     'consequences': "Simulation unavailable"
-                })
+                }
+        
+        # Each action is an independent NIM call, so issue them concurrently
+        with ThreadPoolExecutor(max_workers=len(actions)) as executor:
+            outcomes = list(executor.map(simulate, actions, prompts))
         
         return outcomes
     
@@ -0,0 +1,7 @@
+"""
+Pytest configuration
+Lets tests import agent, services and data_acquisition from the repository root
+"""
+
+# Smoke test against deployed endpoints, run directly rather than collected
+collect_ignore = ['scripts/test_rag_system.py']
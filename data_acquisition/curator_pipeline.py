@@ -2,29 +2,129 @@
 NeMo Curator Data Pipeline
 Processes raw data and applies quality filters
 """
+import io
 import json
+import hashlib
 import logging
+import os
+import re
 import boto3
-from typing import List, Dict
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from functools import lru_cache
+from typing import List, Dict, Iterable, Iterator, Tuple
 from pathlib import Path
 import spacy
 from datetime import datetime
 
+try:
+    import xxhash
+except ImportError:
+    # Fall back to stdlib BLAKE2 if xxhash is not installed
+    xxhash = None
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Common English function words used for lightweight language detection
+_EN_WORDS = frozenset(('the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'for', 'to'))
+
+# Pattern-based PII fallback, compiled once
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_PHONE_RE = re.compile(r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b')
+_SSN_RE = re.compile(r'\b\d{3}-\d{2}-\d{4}\b')
+
+# Entity types redacted by NER-based PII removal
+_PII_ENTITY_TYPES = frozenset(('PERSON', 'EMAIL', 'PHONE'))
+
+# The curator only uses spaCy for NER, which has its own internal tok2vec layer
+_PII_EXCLUDED_PIPES = ['tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer']
+
+def content_fingerprint(text: str) -> int:
+    """Stable 64-bit content fingerprint used for deduplication"""
+    data = (text or '').encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+def _dumps(doc: Dict) -> bytes:
+    """Serialize a document as a single JSONL record"""
+    if orjson is not None:
+        return orjson.dumps(doc)
+    return json.dumps(doc).encode('utf-8')
+
+def _loads(line):
+    """Parse a single JSONL record"""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+# Larger connection pool and adaptive retries for bulk S3 transfers
+_S3_CONFIG = Config(
+    max_pool_connections=64,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    tcp_keepalive=True
+)
+
+# Uploads are split into 8MB parts sent in parallel
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=32,
+    use_threads=True
+)
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """Shared S3 client, created once per process"""
+    return boto3.client('s3', config=_S3_CONFIG)
+
+class _JsonlStream(io.RawIOBase):
+    """Read-only file object that serializes documents to JSONL on demand"""
+    
+    def __init__(self, documents: Iterable[Dict]):
+        self._documents = iter(documents)
+        self._pending = b''
+        self.count = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                doc = next(self._documents)
+            except StopIteration:
+                return 0
+            self._pending = (b'\n' if self.count else b'') + _dumps(doc)
+            self.count += 1
+        
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
 class DataCurator:
     """Curates data using quality filters and preprocessing"""
     
-    def __init__(self):
+    def __init__(self, pii_batch_size: int = 64, pii_processes: int = None):
+        self.pii_batch_size = pii_batch_size
+        self.pii_processes = pii_processes or max(1, (os.cpu_count() or 2) // 2)
+        
         # Load spaCy model for NLP processing
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = spacy.load("en_core_web_sm", exclude=_PII_EXCLUDED_PIPES)
         except OSError:
             logger.warning("spaCy model not found. Install with: python -m spacy download en_core_web_sm")
             self.nlp = None
         
-        self.s3_client = boto3.client('s3')
+        self.s3_client = get_s3_client()
     
     def deduplicate(self, documents: List[Dict]) -> List[Dict]:
         """Remove duplicate documents based on content hash"""
@@ -32,7 +132,7 @@ class DataCurator:
         unique = []
         
         for doc in documents:
-            content_hash = hash(doc.get('content', ''))
+            content_hash = content_fingerprint(doc.get('content', ''))
             if content_hash not in seen:
                 seen.add(content_hash)
                 unique.append(doc)
@@ -46,9 +146,8 @@ class DataCurator:
             return 'unknown'
         
         # Simple English detection (can be enhanced with langdetect library)
-        common_english_words = ['the', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'for', 'to']
         words = text.lower().split()
-        english_count = sum(1 for word in words if word in common_english_words)
+        english_count = sum(1 for word in words if word in _EN_WORDS)
         
         if len(words) > 0 and english_count / len(words) > 0.1:
             return 'en'
@@ -123,72 +222,132 @@ class DataCurator:
         """Remove personally identifiable information"""
         if not self.nlp:
             # Simple pattern-based PII removal
-            import re
-            
-            # Email patterns
-            text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', text)
-            
-            # Phone patterns
-            text = re.sub(r'\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b', '[PHONE]', text)
-            
-            # SSN patterns
-            text = re.sub(r'\b\d{3}-\d{2}-\d{4}\b', '[SSN]', text)
+            text = _EMAIL_RE.sub('[EMAIL]', text)
+            text = _PHONE_RE.sub('[PHONE]', text)
+            text = _SSN_RE.sub('[SSN]', text)
             
             return text
         
         # Use spaCy for NER-based PII removal
-        doc = self.nlp(text)
-        
-        # Remove named entities that might be PII
-        filtered_tokens = []
-        for token in doc:
-            if token.ent_type_ in ['PERSON', 'EMAIL', 'PHONE']:
-                continue
-            filtered_tokens.append(token.text)
+        return self._redact_entities(self.nlp(text))
+    
+    def _redact_entities(self, doc) -> str:
+        """Rebuild text from a spaCy Doc without tokens that might be PII"""
+        return ' '.join(token.text for token in doc if token.ent_type_ not in _PII_ENTITY_TYPES)
+    
+    def remove_pii_batch(self, items: Iterable[Tuple[str, Dict]]) -> Iterator[Tuple[str, Dict]]:
+        """Remove PII from a stream of (text, context) pairs using batched NER"""
+        if not self.nlp:
+            for text, context in items:
+                yield self.remove_pii(text), context
+            return
         
-        return ' '.join(filtered_tokens)
+        docs = self.nlp.pipe(
+            items,
+            as_tuples=True,
+            batch_size=self.pii_batch_size,
+            n_process=self.pii_processes
+        )
+        for doc, context in docs:
+            yield self._redact_entities(doc), context
     
-    def process(self, documents: List[Dict], apply_pii_removal: bool = True) -> List[Dict]:
-        """Process documents through quality filters"""
-        logger.info(f"Processing {len(documents)} documents")
+    def _iter_filtered(self, documents: Iterable[Dict], min_quality: int) -> Iterator[Tuple[str, Dict]]:
+        """Deduplicate, language-filter and quality-filter documents in a single pass"""
+        seen = set()
+        total = 0
+        curated = 0
+        duplicates = 0
+        non_english = 0
+        low_quality = 0
         
-        # Step 1: Deduplicate
-        curated = self.deduplicate(documents)
+        for doc in documents:
+            total += 1
+            content = doc.get('content', doc.get('text', '')) or ''
+            
+            # Step 1: Deduplicate
+            content_hash = content_fingerprint(content)
+            if content_hash in seen:
+                duplicates += 1
+                continue
+            seen.add(content_hash)
+            
+            # Step 2: Language detection
+            if self.detect_language(content) != 'en':
+                non_english += 1
+                continue
+            
+            # Step 3: Quality assessment
+            quality = self.assess_text_quality(content)
+            if quality['score'] < min_quality:
+                low_quality += 1
+                continue
+            doc['quality_metrics'] = quality
+            
+            curated += 1
+            yield content, doc
         
-        # Step 2: Language detection
-        curated = self.filter_language(curated)
+        logger.info(f"Removed {duplicates} duplicates, {non_english} non-English "
+                    f"and {low_quality} low quality documents (min score: {min_quality})")
+        logger.info(f"Curated {curated} of {total} documents")
+    
+    def iter_process(self, documents: Iterable[Dict], apply_pii_removal: bool = True,
+                     min_quality: int = 60) -> Iterator[Dict]:
+        """Lazily process documents through quality filters and PII removal"""
+        filtered = self._iter_filtered(documents, min_quality)
         
-        # Step 3: Quality assessment
-        curated = self.filter_quality(curated)
+        if not apply_pii_removal:
+            for _, doc in filtered:
+                yield doc
+            return
         
-        # Step 4: PII removal
-        if apply_pii_removal:
-            for doc in curated:
-                content = doc.get('content', doc.get('text', ''))
-                doc['content'] = self.remove_pii(content)
-                doc['pii_removed'] = True
-                doc['curated_at'] = datetime.utcnow().isoformat()
+        # Step 4: PII removal, batched through spaCy over the survivors only
+        curated_at = datetime.utcnow().isoformat()
+        for content, doc in self.remove_pii_batch(filtered):
+            doc['content'] = content
+            doc['pii_removed'] = True
+            doc['curated_at'] = curated_at
+            yield doc
+    
+    def process(self, documents: List[Dict], apply_pii_removal: bool = True,
+                min_quality: int = 60) -> List[Dict]:
+        """Process documents through quality filters in a single pass"""
+        logger.info(f"Processing {len(documents)} documents")
+        return list(self.iter_process(documents, apply_pii_removal, min_quality))
+    
+    def iter_from_s3(self, bucket: str, key: str) -> Iterator[Dict]:
+        """Stream documents from a JSONL object in S3"""
+        logger.info(f"Loading from s3://{bucket}/{key}")
         
-        logger.info(f"Curated {len(curated)} documents")
-        return curated
+        response = self.s3_client.get_object(Bucket=bucket, Key=key)
+        for line in response['Body'].iter_lines():
+            if line:
+                yield _loads(line)
     
-    def save_to_s3(self, documents: List[Dict], bucket: str, key: str):
-        """Save curated documents to S3"""
-        logger.info(f"Uploading {len(documents)} documents to s3://{bucket}/{key}")
+    def save_to_s3(self, documents: Iterable[Dict], bucket: str, key: str):
+        """Stream curated documents to S3 as JSONL using a parallel multipart upload"""
+        logger.info(f"Uploading documents to s3://{bucket}/{key}")
         
-        # Save as JSONL
-        body = '\n'.join(json.dumps(doc) for doc in documents)
+        stream = _JsonlStream(documents)
         
-        self.s3_client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=body.encode('utf-8'),
-            ContentType='application/jsonl'
+        # BufferedReader fills each read, so every multipart part gets a full chunk
+        self.s3_client.upload_fileobj(
+            io.BufferedReader(stream, buffer_size=1024 * 1024),
+            bucket,
+            key,
+            ExtraArgs={'ContentType': 'application/jsonl'},
+            Config=_TRANSFER_CONFIG
         )
         
-        logger.info(f"✓ Uploaded to s3://{bucket}/{key}")
+        logger.info(f"✓ Uploaded {stream.count} documents to s3://{bucket}/{key}")
+
+def iter_local(path: str) -> Iterator[Dict]:
+    """Stream documents from a local JSONL file"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
 
-def main():
+def main(argv=None):
     """Main curator pipeline"""
     import argparse
     
@@ -197,33 +356,25 @@ def main():
     parser.add_argument('--output', required=True, help='Output S3 path (bucket/key)')
     parser.add_argument('--min-quality', type=int, default=60, help='Minimum quality score')
     parser.add_argument('--no-pii-removal', action='store_true', help='Skip PII removal')
+    parser.add_argument('--pii-workers', type=int, default=None, help='Processes used for spaCy PII removal')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Initialize curator
-    curator = DataCurator()
-    
-    # Load documents
-    documents = []
+    curator = DataCurator(pii_processes=args.pii_workers)
     
+    # Stream documents through the curator without materializing the corpus
     if args.source.startswith('s3://'):
-        # Load from S3
         bucket, key = args.source.replace('s3://', '').split('/', 1)
-        logger.info(f"Loading from s3://{bucket}/{key}")
-        
-        response = curator.s3_client.get_object(Bucket=bucket, Key=key)
-        for line in response['Body'].iter_lines():
-            if line:
-                documents.append(json.loads(line))
+        documents = curator.iter_from_s3(bucket, key)
     else:
-        # Load from local file
-        with open(args.source, 'r') as f:
-            for line in f:
-                if line.strip():
-                    documents.append(json.loads(line))
-    
-    # Process documents
-    curated_docs = curator.process(documents, apply_pii_removal=not args.no_pii_removal)
+        documents = iter_local(args.source)
+    
+    curated_docs = curator.iter_process(
+        documents,
+        apply_pii_removal=not args.no_pii_removal,
+        min_quality=args.min_quality
+    )
     
     # Save to S3
     bucket, key = args.output.replace('s3://', '').split('/', 1)
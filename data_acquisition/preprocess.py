@@ -2,31 +2,160 @@
 Data Preprocessing Pipeline
 Tokenize, chunk, and extract entities from curated text
 """
+import gc
+import hashlib
 import json
 import logging
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+from collections import OrderedDict, deque
 import boto3
-from typing import List, Dict, Optional
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+from typing import List, Dict, Iterable, Iterator, Optional
 import spacy
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
+try:
+    import ahocorasick
+except ImportError:
+    # Fall back to per-keyword substring scans
+    ahocorasick = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+KNOWN_PHILOSOPHERS = frozenset({'kant', 'mill', 'rawls', 'bentham', 'aristotle', 'plato',
+                                'hume', 'kierkegaard', 'nietzsche', 'sartre', 'foucault'})
+
+ETHICAL_KEYWORDS = ['ethics', 'morality', 'moral', 'ethical', 'virtue', 'duty',
+                    'rights', 'justice', 'fairness', 'utilitarian', 'deontological',
+                    'consequentialist', 'autonomy', 'beneficence', 'non-maleficence']
+
+TECH_KEYWORDS = ['ai', 'artificial intelligence', 'neural', 'brain', 'organoid',
+                 'genetic', 'biotechnology', 'algorithm', 'machine learning',
+                 'consciousness', 'sentient', 'autonomous']
+
+_KEYWORD_CATEGORIES = [('ethical_terms', ETHICAL_KEYWORDS), ('technologies', TECH_KEYWORDS)]
+
+# Connection pool sized for concurrent shard downloads and multipart uploads
+_S3_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 10}
+)
+
+# Uploads above 8MB are split into parts sent in parallel
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+# Chunks spill from memory to disk past this size while being staged for upload
+_UPLOAD_SPOOL_SIZE = 64 * 1024 * 1024
+
+def _dumps(record: Dict) -> bytes:
+    """Serialize a record as a single JSONL line"""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record).encode('utf-8')
+
+def _loads(line):
+    """Parse a single JSONL record"""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+# Chunk metadata keys copied from a document's chunks onto its duplicates
+_SHARED_CHUNK_KEYS = ('concepts', 'entities', 'chunk_id', 'chunk_length', 'preprocessed_at')
+
+# Pipeline components each task needs; everything else is switched off per call
+_SENTENCE_PIPES = ["tok2vec", "parser"]
+_ENTITY_PIPES = ["tok2vec", "ner"]
+_CHUNK_ENTITY_PIPES = ["tok2vec", "parser", "ner"]
+
+# Regex stand-ins for NER used when spaCy is kept off the ingest path. Surnames must be
+# capitalized ("paper mill" is not Mill), and given names are only taken mid-sentence,
+# since a sentence-initial capital ("In Plato's view") says nothing about being a name.
+_PHILOSOPHER_RE = re.compile(
+    r"(?:(?<=[^.!?\s]\s)(?:[A-Z][a-z]+\s+)+)?\b(?:"
+    + "|".join(re.escape(name[0].upper()) + "(?i:" + re.escape(name[1:]) + ")"
+               for name in sorted(KNOWN_PHILOSOPHERS))
+    + r")\b"
+)
+_ORG_RE = re.compile(
+    r"\b(?:[A-Z][\w&.-]*\s+)+(?:Inc|Corp|University|Institute|Lab|Laboratory|Foundation)\b"
+)
+
+@lru_cache(maxsize=1)
+def _get_nlp(disable=("lemmatizer", "attribute_ruler")):
+    """
+    Load the spaCy model once per process
+
+    The model is loaded in the parent before nlp.pipe starts its workers, so
+    with the fork start method (Linux) workers share its memory pages
+    copy-on-write; see main() for keeping the collector off those pages.
+    Spawn-based platforms (Windows, macOS) load a copy per worker instead.
+
+    Returns None if the model is not installed. Call _get_nlp.cache_clear()
+    to force a reload.
+    """
+    try:
+        nlp = spacy.load("en_core_web_sm", disable=list(disable))
+    except OSError:
+        logger.warning("spaCy model not found. Install with: python -m spacy download en_core_web_sm")
+        return None
+    
+    return nlp
+
 class DataPreprocessor:
     """Preprocesses curated documents for embedding"""
     
-    def __init__(self, chunk_size: int = 500):
+    # (Author, Year) citations | footnote markers [1], 1 | URLs | email addresses
+    _NORMALIZE_RE = re.compile(
+        r"(\([A-Z][a-z]+\s*,\s*\d{4}\))"
+        r"|(\[?\d+\]?)"
+        r"|(http\S+)"
+        r"|(\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)"
+    )
+    _WS_RE = re.compile(r"\s+")
+    
+    def __init__(self, chunk_size: int = 500, batch_size: int = 64, n_process: int = None,
+                 lazy_spacy: bool = True, dedupe_cache_size: int = 1024):
         self.chunk_size = chunk_size  # Target chunk size in tokens
-        
-        # Load spaCy model
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.warning("spaCy model not found. Install with: python -m spacy download en_core_web_sm")
-            self.nlp = None
-        
-        self.s3_client = boto3.client('s3')
+        self.batch_size = batch_size
+        self.n_process = n_process or os.cpu_count() or 1
+        # When enabled, concepts come from regex matching and NER is skipped at ingest
+        self.lazy_spacy = lazy_spacy
+        # Number of recently processed texts whose chunks are kept for duplicate documents
+        self.dedupe_cache_size = dedupe_cache_size
+        
+        # Multi-pattern matcher for ethical and technology keywords
+        self._concept_automaton = None
+        if ahocorasick is not None:
+            self._concept_automaton = ahocorasick.Automaton()
+            for _, keywords in _KEYWORD_CATEGORIES:
+                for keyword in keywords:
+                    self._concept_automaton.add_word(keyword, keyword)
+            self._concept_automaton.make_automaton()
+        
+        # Shared spaCy model (only sentence boundaries and entities are used)
+        self.nlp = _get_nlp()
+        
+        self.s3_client = boto3.client('s3', config=_S3_CONFIG)
     
     def chunk_text(self, text: str, metadata: Dict = None) -> List[Dict]:
         """
@@ -43,49 +172,50 @@ class DataPreprocessor:
             # Simple word-based chunking if spaCy not available
             return self._simple_chunk(text, metadata)
         
-        # Use spaCy for intelligent sentence-aware chunking
-        doc = self.nlp(text)
-        
+        with self.nlp.select_pipes(enable=_SENTENCE_PIPES):
+            doc = self.nlp(text)
+        return self._chunk_doc(doc, metadata)
+    
+    def _chunk_doc(self, doc, metadata: Dict = None) -> List[Dict]:
+        """Sentence-aware chunking of an already parsed spaCy Doc"""
         chunks = []
-        current_chunk = []
+        text = doc.text
+        current_start = None
+        current_end = 0
         current_length = 0
-        chunk_id = 0
+        
+        # Shared per-document metadata; each chunk only adds its own keys
+        base_metadata = dict(metadata or {})
+        base_metadata['preprocessed_at'] = datetime.utcnow().isoformat()
+        
+        def add_chunk():
+            chunk_metadata = base_metadata.copy()
+            chunk_metadata['chunk_id'] = len(chunks)
+            chunk_metadata['chunk_length'] = current_length
+            chunks.append({
+                # Slice the source text by character offsets instead of joining sentences
+                'text': text[current_start:current_end],
+                'metadata': chunk_metadata
+            })
         
         for sent in doc.sents:
-            sent_tokens = len(sent)
+            sent_tokens = sent.end - sent.start
             
             # If adding this sentence would exceed chunk size
-            if current_length + sent_tokens > self.chunk_size and current_chunk:
+            if current_length + sent_tokens > self.chunk_size and current_start is not None:
                 # Save current chunk
-                chunk_text = ' '.join(current_chunk)
-                chunks.append({
-                    'text': chunk_text,
-                    'metadata': {
-                        **(metadata or {}),
-                        'chunk_id': chunk_id,
-                        'chunk_length': current_length,
-                        'preprocessed_at': datetime.utcnow().isoformat()
-                    }
-                })
-                chunk_id += 1
-                current_chunk = [sent.text]
+                add_chunk()
+                current_start = sent.start_char
                 current_length = sent_tokens
             else:
-                current_chunk.append(sent.text)
+                if current_start is None:
+                    current_start = sent.start_char
                 current_length += sent_tokens
+            current_end = sent.end_char
         
         # Add final chunk
-        if current_chunk:
-            chunk_text = ' '.join(current_chunk)
-            chunks.append({
-                'text': chunk_text,
-                'metadata': {
-                    **(metadata or {}),
-                    'chunk_id': chunk_id,
-                    'chunk_length': current_length,
-                    'preprocessed_at': datetime.utcnow().isoformat()
-                }
-            })
+        if current_start is not None:
+            add_chunk()
         
         return chunks
     
@@ -95,36 +225,64 @@ class DataPreprocessor:
         chunks = []
         chunk_id = 0
         
+        base_metadata = dict(metadata or {})
+        base_metadata['preprocessed_at'] = datetime.utcnow().isoformat()
+        
         for i in range(0, len(words), self.chunk_size):
             chunk = ' '.join(words[i:i + self.chunk_size])
+            chunk_metadata = base_metadata.copy()
+            chunk_metadata['chunk_id'] = chunk_id
             chunks.append({
                 'text': chunk,
-                'metadata': {
-                    **(metadata or {}),
-                    'chunk_id': chunk_id,
-                    'preprocessed_at': datetime.utcnow().isoformat()
-                }
+                'metadata': chunk_metadata
             })
             chunk_id += 1
         
         return chunks
     
-    def extract_entities(self, text: str) -> List[str]:
-        """Extract named entities from text"""
-        if not self.nlp:
+    def extract_entities(self, text: str, force: bool = False) -> List[str]:
+        """
+        Extract named entities from text
+
+        Returns an empty list in lazy_spacy mode unless force is set.
+        """
+        if not self.nlp or (self.lazy_spacy and not force):
             return []
         
-        doc = self.nlp(text)
-        entities = list(set([ent.text for ent in doc.ents]))
-        return entities
+        with self.nlp.select_pipes(enable=_ENTITY_PIPES):
+            doc = self.nlp(text)
+        return self._entities_from_doc(doc)
+    
+    def _entities_from_doc(self, doc) -> List[str]:
+        """Unique named entities of an already parsed spaCy Doc"""
+        return list(set([ent.text for ent in doc.ents]))
     
     def extract_concepts(self, text: str) -> Dict[str, List[str]]:
         """Extract key concepts: philosophers, ethical frameworks, technologies"""
+        if self.lazy_spacy:
+            return self._concepts_from_text(text)
+        
         if not self.nlp:
             return {}
         
-        doc = self.nlp(text)
+        with self.nlp.select_pipes(enable=_ENTITY_PIPES):
+            doc = self.nlp(text)
+        return self._concepts_from_doc(doc)
+    
+    def _concepts_from_text(self, text: str) -> Dict[str, List[str]]:
+        """Extract key concepts with regex matching instead of NER"""
+        concepts = {
+            'philosophers': [match.group(0) for match in _PHILOSOPHER_RE.finditer(text)],
+            'ethical_terms': [],
+            'technologies': [],
+            'organizations': [match.group(0) for match in _ORG_RE.finditer(text)]
+        }
         
+        self._add_keyword_concepts(concepts, text)
+        return concepts
+    
+    def _concepts_from_doc(self, doc) -> Dict[str, List[str]]:
+        """Extract key concepts from an already parsed spaCy Doc"""
         concepts = {
             'philosophers': [],
             'ethical_terms': [],
@@ -135,132 +293,252 @@ class DataPreprocessor:
         # Named entity extraction
         for ent in doc.ents:
             if ent.label_ == 'PERSON':
-                # Check if it's a known philosopher
-                person_lower = ent.text.lower()
-                known_philosophers = ['kant', 'mill', 'rawls', 'bentham', 'aristotle', 'plato', 
-                              'hume', 'kierkegaard', 'nietzsche', 'sartre', 'foucault']
-                if any(phil in person_lower for phil in known_philosophers):
+                # Check if it's a known philosopher by surname
+                tokens = ent.text.lower().split()
+                if tokens and tokens[-1].removesuffix("'s") in KNOWN_PHILOSOPHERS:
                     concepts['philosophers'].append(ent.text)
             elif ent.label_ == 'ORG':
                 concepts['organizations'].append(ent.text)
         
-        # Extract ethical terms
-        ethical_keywords = ['ethics', 'morality', 'moral', 'ethical', 'virtue', 'duty', 
-                           'rights', 'justice', 'fairness', 'utilitarian', 'deontological', 
-                           'consequentialist', 'autonomy', 'beneficence', 'non-maleficence']
-        
+        self._add_keyword_concepts(concepts, doc.text)
+        return concepts
+    
+    def _add_keyword_concepts(self, concepts: Dict[str, List[str]], text: str):
+        """Add ethical and technology keyword matches to concepts"""
         text_lower = text.lower()
-        for keyword in ethical_keywords:
-            if keyword in text_lower:
-                concepts['ethical_terms'].append(keyword)
-        
-        # Extract technology terms
-        tech_keywords = ['ai', 'artificial intelligence', 'neural', 'brain', 'organoid', 
-                        'genetic', 'biotechnology', 'algorithm', 'machine learning', 
-                        'consciousness', 'sentient', 'autonomous']
-        
-        for keyword in tech_keywords:
-            if keyword in text_lower:
-                concepts['technologies'].append(keyword)
         
-        return concepts
+        if self._concept_automaton is None:
+            for category, keywords in _KEYWORD_CATEGORIES:
+                for keyword in keywords:
+                    if keyword in text_lower:
+                        concepts[category].append(keyword)
+            return
+        
+        # Single pass over the text for all keywords, reported in keyword list order
+        found = {keyword for _, keyword in self._concept_automaton.iter(text_lower)}
+        for category, keywords in _KEYWORD_CATEGORIES:
+            concepts[category].extend(keyword for keyword in keywords if keyword in found)
     
     def normalize_text(self, text: str) -> str:
         """Normalize text: remove citations, clean up formatting"""
-        # Remove common citation patterns
-        import re
-        
-        # Remove (Author, Year) citations
-        text = re.sub(r'\([A-Z][a-z]+\s*,\s*\d{4}\)', '', text)
+        # Remove citations, footnote markers, URLs and emails in one pass
+        text = self._NORMALIZE_RE.sub('', text)
         
-        # Remove footnote markers [1], (1), etc.
-        text = re.sub(r'\[?\d+\]?', '', text)
-        
-        # Remove multiple whitespaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove URLs
-        text = re.sub(r'http\S+', '', text)
-        
-        # Remove email addresses
-        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
+        # Collapse whitespace, including gaps left by removed spans
+        text = self._WS_RE.sub(' ', text)
         
         return text.strip()
     
-    def preprocess(self, documents: List[Dict]) -> List[Dict]:
+    def preprocess(self, documents: Iterable[Dict]) -> List[Dict]:
         """
         Preprocess documents for vector store
         
         Returns:
             List of chunks ready for embedding
         """
-        all_chunks = []
+        return list(self.iter_preprocess(documents))
+    
+    def iter_preprocess(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Stream chunks from documents without materializing the corpus
         
-        for doc_idx, doc in enumerate(documents):
-            text = doc.get('content', doc.get('text', ''))
-            if not text:
-                continue
-            
-            # Normalize text
-            text = self.normalize_text(text)
+        Args:
+            documents: Any iterable of documents, e.g. from load_from_s3
             
-            # Extract metadata
-            metadata = {
-                **doc.get('metadata', {}),
-                'source': doc.get('source', 'unknown'),
-                'id': doc.get('id', f"doc_{doc_idx}"),
-                'url': doc.get('url', ''),
-                'license': doc.get('license', '')
-            }
+        Yields:
+            Chunks ready for embedding
+        """
+        counts = {'documents': 0, 'duplicates': 0, 'chunks': 0}
+        
+        # Identical texts are parsed once and their chunks cloned under each copy's metadata
+        in_flight = {}  # hash -> metadata of copies waiting on the first one to be parsed
+        processed = OrderedDict()  # hash -> chunks of recently processed texts
+        ready = deque()  # (chunks, metadata) of copies whose text was already processed
+        
+        def normalized_pairs():
+            for doc_idx, doc in enumerate(documents):
+                text = doc.get('content', doc.get('text', ''))
+                if not text:
+                    continue
+                
+                # Normalize text
+                text = self.normalize_text(text)
+                
+                # Extract metadata
+                metadata = {
+                    **doc.get('metadata', {}),
+                    'source': doc.get('source', 'unknown'),
+                    'id': doc.get('id', f"doc_{doc_idx}"),
+                    'url': doc.get('url', ''),
+                    'license': doc.get('license', '')
+                }
+                
+                text_hash = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+                if text_hash in in_flight:
+                    in_flight[text_hash].append(metadata)
+                    continue
+                if text_hash in processed:
+                    processed.move_to_end(text_hash)
+                    ready.append((processed[text_hash], metadata))
+                    continue
+                
+                in_flight[text_hash] = []
+                yield text, (text_hash, metadata)
+        
+        def duplicates() -> Iterator[Dict]:
+            while ready:
+                chunks, metadata = ready.popleft()
+                counts['duplicates'] += 1
+                yield from self._clone_chunks(chunks, metadata)
+        
+        def finish(text_hash: bytes, chunks: List[Dict]) -> Iterator[Dict]:
+            counts['documents'] += 1
+            yield from chunks
             
-            # Extract concepts
-            concepts = self.extract_concepts(text)
-            metadata['concepts'] = concepts
+            for metadata in in_flight.pop(text_hash):
+                counts['duplicates'] += 1
+                yield from self._clone_chunks(chunks, metadata)
             
-            # Extract named entities
-            entities = self.extract_entities(text)
-            metadata['entities'] = entities
+            processed[text_hash] = chunks
+            if len(processed) > self.dedupe_cache_size:
+                processed.popitem(last=False)
             
-            # Chunk text
-            chunks = self.chunk_text(text, metadata)
-            all_chunks.extend(chunks)
+            yield from duplicates()
+        
+        def generate() -> Iterator[Dict]:
+            if not self.nlp:
+                for text, (text_hash, metadata) in normalized_pairs():
+                    metadata['concepts'] = self._concepts_from_text(text) if self.lazy_spacy else {}
+                    metadata['entities'] = []
+                    yield from finish(text_hash, self._simple_chunk(text, metadata))
+            else:
+                # Parse each document once and reuse the Doc for concepts, entities and chunking.
+                # In lazy mode only sentence boundaries are needed, so NER is skipped.
+                pipes = _SENTENCE_PIPES if self.lazy_spacy else _CHUNK_ENTITY_PIPES
+                parsed = self.nlp.pipe(
+                    normalized_pairs(),
+                    as_tuples=True,
+                    batch_size=self.batch_size,
+                    n_process=self.n_process,
+                    disable=[name for name in self.nlp.pipe_names if name not in pipes]
+                )
+                for doc, (text_hash, metadata) in parsed:
+                    if self.lazy_spacy:
+                        metadata['concepts'] = self._concepts_from_text(doc.text)
+                        metadata['entities'] = []
+                    else:
+                        metadata['concepts'] = self._concepts_from_doc(doc)
+                        metadata['entities'] = self._entities_from_doc(doc)
+                    yield from finish(text_hash, self._chunk_doc(doc, metadata))
+                    
+                    if counts['documents'] % 100 == 0:
+                        logger.info(f"Processed {counts['documents']} documents")
             
-            if (doc_idx + 1) % 100 == 0:
-                logger.info(f"Processed {doc_idx + 1}/{len(documents)} documents")
+            # Copies read after the last unique document was parsed
+            yield from duplicates()
         
-        logger.info(f"Generated {len(all_chunks)} chunks from {len(documents)} documents")
-        return all_chunks
+        for chunk in generate():
+            counts['chunks'] += 1
+            yield chunk
+        
+        logger.info(
+            f"Generated {counts['chunks']} chunks from {counts['documents']} documents "
+            f"({counts['duplicates']} duplicates reused)"
+        )
+    
+    def _clone_chunks(self, chunks: List[Dict], metadata: Dict) -> Iterator[Dict]:
+        """Copy the chunks of an identical document under another document's metadata"""
+        for chunk in chunks:
+            chunk_metadata = dict(metadata)
+            for key in _SHARED_CHUNK_KEYS:
+                if key in chunk['metadata']:
+                    chunk_metadata[key] = chunk['metadata'][key]
+            yield {'text': chunk['text'], 'metadata': chunk_metadata}
     
-    def load_from_s3(self, bucket: str, key: str) -> List[Dict]:
-        """Load documents from S3"""
+    def load_from_s3(self, bucket: str, key: str) -> Iterator[Dict]:
+        """Stream documents from a JSONL object in S3"""
         logger.info(f"Loading from s3://{bucket}/{key}")
         
         response = self.s3_client.get_object(Bucket=bucket, Key=key)
-        documents = []
         
         for line in response['Body'].iter_lines():
             if line:
-                documents.append(json.loads(line))
-        
-        return documents
+                yield _loads(line)
     
-    def save_to_s3(self, chunks: List[Dict], bucket: str, key: str):
-        """Save preprocessed chunks to S3"""
-        logger.info(f"Uploading {len(chunks)} chunks to s3://{bucket}/{key}")
-        
-        # Save as JSONL
-        body = '\n'.join(json.dumps(chunk) for chunk in chunks)
+    def _fetch_s3_lines(self, bucket: str, key: str) -> List[bytes]:
+        """Download one JSONL object and split it into non-empty lines"""
+        response = self.s3_client.get_object(Bucket=bucket, Key=key)
+        return [line for line in response['Body'].iter_lines() if line]
+    
+    def load_from_s3_prefix(self, bucket: str, prefix: str, max_workers: int = 16) -> Iterator[Dict]:
+        """
+        Stream documents from every JSONL shard under an S3 prefix
         
-        self.s3_client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=body.encode('utf-8'),
-            ContentType='application/jsonl'
+        Shards are downloaded concurrently, at most max_workers at a time,
+        and documents are yielded in shard completion order.
+        """
+        logger.info(f"Loading shards from s3://{bucket}/{prefix}")
+        
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        keys = (
+            obj['Key']
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for obj in page.get('Contents', [])
+            if not obj['Key'].endswith('/')
         )
         
-        logger.info(f"✓ Uploaded to s3://{bucket}/{key}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            for key in keys:
+                pending.add(executor.submit(self._fetch_s3_lines, bucket, key))
+                if len(pending) < max_workers:
+                    continue
+                # Bound in-flight shards so memory stays proportional to max_workers
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for line in future.result():
+                        yield _loads(line)
+            
+            for future in pending:
+                for line in future.result():
+                    yield _loads(line)
+    
+    def save_to_s3(self, chunks: Iterable[Dict], bucket: str, key: str):
+        """Save preprocessed chunks to S3"""
+        logger.info(f"Uploading chunks to s3://{bucket}/{key}")
+        
+        # Write JSONL incrementally instead of joining one large string
+        count = 0
+        with tempfile.SpooledTemporaryFile(max_size=_UPLOAD_SPOOL_SIZE) as body:
+            for chunk in chunks:
+                if count:
+                    body.write(b'\n')
+                body.write(_dumps(chunk))
+                count += 1
+            body.seek(0)
+            
+            self.s3_client.upload_fileobj(
+                body,
+                bucket,
+                key,
+                ExtraArgs={'ContentType': 'application/jsonl'},
+                Config=_TRANSFER_CONFIG
+            )
+        
+        logger.info(f"✓ Uploaded {count} chunks to s3://{bucket}/{key}")
 
-def main():
+def iter_local(path: str) -> Iterator[Dict]:
+    """Stream documents from a local JSONL file through a read-only memory map"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                if line.strip():
+                    yield _loads(line)
+
+def main(argv=None):
     """Main preprocessing pipeline"""
     import argparse
     
@@ -268,35 +546,52 @@ def main():
     parser.add_argument('--source', required=True, help='Source S3 path (bucket/key) or local file')
     parser.add_argument('--output', required=True, help='Output S3 path (bucket/key) or local file')
     parser.add_argument('--chunk-size', type=int, default=500, help='Chunk size in tokens')
+    parser.add_argument('--full-ner', action='store_true', help='Run spaCy NER for concepts and entities at ingest')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Initialize preprocessor
-    preprocessor = DataPreprocessor(chunk_size=args.chunk_size)
+    preprocessor = DataPreprocessor(chunk_size=args.chunk_size, lazy_spacy=not args.full_ner)
     
     # Load documents
     if args.source.startswith('s3://'):
         bucket, key = args.source.replace('s3://', '').split('/', 1)
-        documents = preprocessor.load_from_s3(bucket, key)
+        if key.endswith('/'):
+            # A trailing slash means a prefix of JSONL shards
+            documents = preprocessor.load_from_s3_prefix(bucket, key)
+        else:
+            documents = preprocessor.load_from_s3(bucket, key)
     else:
         # Load from local file
-        with open(args.source, 'r') as f:
-            documents = [json.loads(line) for line in f if line.strip()]
+        documents = iter_local(args.source)
     
-    # Preprocess documents
-    chunks = preprocessor.preprocess(documents)
+    # Forked nlp.pipe workers share the parent's heap copy-on-write. Collect garbage
+    # left by earlier stages, then freeze the survivors (the loaded model among them)
+    # so collections in the workers do not touch, and copy, those pages.
+    freeze = preprocessor.n_process > 1 and multiprocessing.get_start_method() == 'fork'
+    if freeze:
+        gc.collect()
+        gc.freeze()
     
-    # Save chunks
-    if args.output.startswith('s3://'):
-        bucket, key = args.output.replace('s3://', '').split('/', 1)
-        preprocessor.save_to_s3(chunks, bucket, key)
-    else:
-        # Save to local file
-        with open(args.output, 'w') as f:
-            for chunk in chunks:
-                f.write(json.dumps(chunk) + '\n')
-        
-        logger.info(f"✓ Saved to {args.output}")
+    try:
+        # Preprocess documents lazily so chunks stream straight to the output
+        chunks = preprocessor.iter_preprocess(documents)
+        
+        # Save chunks
+        if args.output.startswith('s3://'):
+            bucket, key = args.output.replace('s3://', '').split('/', 1)
+            preprocessor.save_to_s3(chunks, bucket, key)
+        else:
+            # Save to local file
+            with open(args.output, 'wb') as f:
+                for chunk in chunks:
+                    f.write(_dumps(chunk) + b'\n')
+            
+            logger.info(f"✓ Saved to {args.output}")
+    finally:
+        # Later pipeline stages in this process get normal collection back
+        if freeze:
+            gc.unfreeze()
 
 if __name__ == "__main__":
     main()
@@ -3,24 +3,91 @@ arXiv API Scraper for AI Ethics Papers
 Uses official arXiv API - no web scraping required
 """
 import requests
-import feedparser
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator
+import threading
+import time
 import json
 from datetime import datetime
 import logging
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
+try:
+    from lxml import etree
+    # The feed is remote input, so entities and network lookups stay disabled
+    _XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+except ImportError:
+    # The stdlib ElementTree offers the same find API, just without lxml's C speedups
+    from xml.etree import ElementTree as etree
+    _XML_PARSER = None
+
+# Namespaces used by arXiv API Atom responses
+_NS = {
+    'a': 'http://www.w3.org/2005/Atom',
+    'arxiv': 'http://arxiv.org/schemas/atom'
+}
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _create_session(max_retries: int = 3) -> requests.Session:
+    """Create a keep-alive HTTP session that retries transient failures with backoff"""
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def _dumps(record: Dict) -> bytes:
+    """Serialize a record as a single JSONL line"""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record).encode('utf-8')
+
 class ArxivScraper:
-    def __init__(self, base_url: str = "https://arxiv.org/api/query"):
+    def __init__(self, base_url: str = "https://arxiv.org/api/query", min_interval: float = 3.0):
         self.base_url = base_url
+        # arXiv asks API clients for at most one request every three seconds
+        self.min_interval = min_interval
+        self.last_request_time = 0
+        self._rate_lock = threading.Lock()
+        self.session = _create_session()
+    
+    def _rate_limit(self):
+        """Enforce the request interval across all worker threads"""
+        with self._rate_lock:
+            elapsed = time.time() - self.last_request_time
+            if elapsed < self.min_interval:
+                time.sleep(self.min_interval - elapsed)
+            self.last_request_time = time.time()
     
     def search_papers(self, query: str, max_results: int = 100) -> List[Dict]:
         """
         Search arXiv for papers matching query
         Returns list of paper metadata
         """
+        papers = list(self.iter_papers(query, max_results))
+        logger.info(f"Found {len(papers)} papers")
+        return papers
+    
+    def iter_papers(self, query: str, max_results: int = 100) -> Iterator[Dict]:
+        """
+        Search arXiv for papers matching query
+        Yields paper metadata as each entry is parsed
+        """
         params = {
             'search_query': query,
             'start': 0,
@@ -30,68 +97,93 @@ class ArxivScraper:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
+            self._rate_limit()
+            response = self.session.get(self.base_url, params=params, timeout=30)
             response.raise_for_status()
             
-            feed = feedparser.parse(response.content)
-            papers = []
-            
-            for entry in feed.entries:
+            root = etree.fromstring(response.content, parser=_XML_PARSER)
+        except Exception as e:
+            logger.error(f"Error searching arXiv: {e}")
+            return
+        
+        # Fixed paths into the Atom schema replace feedparser's generic feed walk
+        for entry in root.iterfind('a:entry', _NS):
+            try:
                 # Extract information
-                paper = {
-                    'id': f"arxiv_{entry.id.split('/')[-1]}",
-                    'title': entry.title,
-                    'authors': [author.name for author in entry.authors],
-                    'published': entry.published,
-                    'arxiv_id': entry.id.split('/')[-1],
-                    'summary': entry.summary,
-                    'url': entry.link,
+                arxiv_id = entry.findtext('a:id', namespaces=_NS).strip().split('/')[-1]
+                link = entry.find('a:link[@rel="alternate"]', _NS)
+                primary_category = entry.find('arxiv:primary_category', _NS)
+                yield {
+                    'id': f"arxiv_{arxiv_id}",
+                    'title': entry.findtext('a:title', namespaces=_NS).strip(),
+                    'authors': [name.text.strip() for name in entry.iterfind('a:author/a:name', _NS)],
+                    'published': entry.findtext('a:published', namespaces=_NS).strip(),
+                    'arxiv_id': arxiv_id,
+                    'summary': entry.findtext('a:summary', namespaces=_NS).strip(),
+                    'url': link.get('href') if link is not None else None,
                     'source': 'arXiv',
                     'license': 'arXiv Open Access',
                     'scraped_at': datetime.utcnow().isoformat(),
-                    'tags': [tag.term for tag in entry.tags],
-                    'arxiv_primary_category': entry.arxiv_primary_category['term'] if hasattr(entry, 'arxiv_primary_category') else None
+                    'tags': [category.get('term') for category in entry.iterfind('a:category', _NS)],
+                    'arxiv_primary_category': primary_category.get('term') if primary_category is not None else None
                 }
-                papers.append(paper)
-            
-            logger.info(f"Found {len(papers)} papers")
-            return papers
+            except Exception as e:
+                logger.error(f"Error parsing arXiv entry: {e}")
+    
+    def search_many(self, queries: List[str], max_results: int = 100, max_workers: int = 4) -> List[Dict]:
+        """
+        Run several searches concurrently and merge the results
+        Papers returned by more than one query are kept once. Requests still
+        go out at most once per min_interval; the workers overlap parsing and
+        response transfer with the wait for the next request slot.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda query: self.search_papers(query, max_results), queries))
         
-        except Exception as e:
-            logger.error(f"Error searching arXiv: {e}")
-            return []
+        papers = {}
+        for result in results:
+            for paper in result:
+                papers.setdefault(paper['id'], paper)
+        
+        return list(papers.values())
     
     def filter_relevant(self, papers: List[Dict], keywords: List[str] = None) -> List[Dict]:
         """Filter papers based on keywords in title/summary"""
         if not keywords:
             return papers
         
-        keywords_lower = [kw.lower() for kw in keywords]
-        relevant = []
+        return list(self.iter_relevant(papers, keywords))
+    
+    def iter_relevant(self, papers: Iterable[Dict], keywords: List[str] = None) -> Iterator[Dict]:
+        """Lazily filter papers based on keywords in title/summary"""
+        keywords_lower = [kw.lower() for kw in keywords or []]
         
         for paper in papers:
             text = f"{paper['title']} {paper['summary']}".lower()
-            if any(kw in text for kw in keywords_lower):
-                relevant.append(paper)
-        
-        return relevant
+            if not keywords_lower or any(kw in text for kw in keywords_lower):
+                yield paper
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Scrape relevant arXiv papers to JSONL"""
     scraper = ArxivScraper()
     
     # Search for AI ethics and consciousness papers
     query = "cat:cs.AI AND (abstract:\"ethics\" OR abstract:\"consciousness\" OR abstract:\"mind\")"
     
-    papers = scraper.search_papers(query, max_results=50)
+    papers = scraper.iter_papers(query, max_results=50)
     
     # Filter for relevant papers
     keywords = ['ethics', 'consciousness', 'artificial', 'sentience', 'rights']
-    relevant_papers = scraper.filter_relevant(papers, keywords)
+    relevant_papers = scraper.iter_relevant(papers, keywords)
     
-    # Save to JSONL
-    with open("data/raw/arxiv_ethics_papers.jsonl", "w") as f:
+    # Write each paper to JSONL as it is parsed
+    count = 0
+    with open("data/raw/arxiv_ethics_papers.jsonl", "wb") as f:
         for paper in relevant_papers:
-            f.write(json.dumps(paper) + "\n")
+            f.write(_dumps(paper) + b"\n")
+            count += 1
     
-    logger.info(f"Saved {len(relevant_papers)} relevant papers")
+    logger.info(f"Saved {count} relevant papers")
 
+if __name__ == "__main__":
+    main()
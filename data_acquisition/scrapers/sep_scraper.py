@@ -3,22 +3,67 @@ Stanford Encyclopedia of Philosophy Scraper
 Respects robots.txt, implements rate limiting, preserves attribution
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from urllib.robotparser import RobotFileParser
 from bs4 import BeautifulSoup
+import threading
 import time
 import json
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import logging
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    # Fall back to BeautifulSoup if selectolax is not installed
+    HTMLParser = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _create_session(max_retries: int = 3) -> requests.Session:
+    """Create a keep-alive HTTP session that retries transient failures with backoff"""
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+_NON_CONTENT_TAGS = ['nav', 'header', 'footer', 'aside', 'script', 'style']
+
+def _dumps(record: Dict) -> bytes:
+    """Serialize a record as a single JSONL line"""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record).encode('utf-8')
+
 class SEPScraper:
     def __init__(self, base_url: str, rate_limit: int = 1):
         self.base_url = base_url
         self.rate_limit = rate_limit  # requests per second
         self.last_request_time = 0
+        self._rate_lock = threading.Lock()
+        # Reuse connections to the same host across articles
+        self.session = _create_session()
+        self.session.headers.update({
+            'User-Agent': 'SynthArbiter/1.0 (Research; Contact: support@example.com)',
+            'Accept': 'text/html'
+        })
         self.robots_parser = RobotFileParser()
         self.robots_parser.set_url(f"{base_url}/robots.txt")
         self.robots_parser.read()
@@ -28,11 +73,12 @@ class SEPScraper:
         return self.robots_parser.can_fetch("SynthArbiter/1.0", url)
     
     def _rate_limit(self):
-        """Enforce rate limiting"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < (1.0 / self.rate_limit):
-            time.sleep((1.0 / self.rate_limit) - elapsed)
-        self.last_request_time = time.time()
+        """Enforce rate limiting across all worker threads"""
+        with self._rate_lock:
+            elapsed = time.time() - self.last_request_time
+            if elapsed < (1.0 / self.rate_limit):
+                time.sleep((1.0 / self.rate_limit) - elapsed)
+            self.last_request_time = time.time()
     
     def fetch_article(self, path: str) -> Dict:
         """
@@ -48,43 +94,14 @@ class SEPScraper:
         self._rate_limit()
         
         try:
-            response = requests.get(
-                url,
-                headers={
-                    'User-Agent': 'SynthArbiter/1.0 (Research; Contact: support@example.com)',
-                    'Accept': 'text/html'
-                },
-                timeout=30
-            )
+            response = self.session.get(url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract article metadata
-            title = soup.find('h1', class_='article-title')
-            if not title:
-                title = soup.find('title')
-            title_text = title.get_text(strip=True) if title else path.split('/')[-1]
-            
-            # Extract article body (main content)
-            article_body = soup.find('div', class_='article-content') or soup.find('article')
-            if not article_body:
-                article_body = soup.find('div', id='main-text')
-            
-            if not article_body:
+            parsed = self._parse_article(response.text, path)
+            if not parsed:
                 logger.error(f"Could not find article content in {url}")
                 return None
-            
-            # Remove non-content elements
-            for tag in article_body.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style']):
-                tag.decompose()
-            
-            content = article_body.get_text(separator='\n', strip=True)
-            
-            # Extract references/citations
-            references = []
-            for ref in article_body.find_all(['cite', 'span'], class_='reference'):
-                references.append(ref.get_text(strip=True))
+            title_text, content, references = parsed
             
             return {
                 'id': f"sep_{path.replace('/', '_')}",
@@ -102,18 +119,90 @@ class SEPScraper:
             logger.error(f"Error fetching {url}: {e}")
             return None
     
-    def scrape_articles(self, paths: List[str]) -> List[Dict]:
+    def _parse_article(self, html: str, path: str):
+        """
+        Extract (title, content, references) from an article page
+        Returns None if no article body is found
+        """
+        if HTMLParser is None:
+            return self._parse_article_bs4(html, path)
+        
+        tree = HTMLParser(html)
+        
+        # Extract article metadata
+        title = tree.css_first('h1.article-title') or tree.css_first('title')
+        title_text = title.text(strip=True) if title else path.split('/')[-1]
+        
+        # Extract article body (main content)
+        article_body = (tree.css_first('div.article-content') or tree.css_first('article')
+                        or tree.css_first('div#main-text'))
+        if not article_body:
+            return None
+        
+        # Remove non-content elements
+        for tag in article_body.css(', '.join(_NON_CONTENT_TAGS)):
+            tag.decompose()
+        
+        content = article_body.text(separator='\n', strip=True)
+        
+        # Extract references/citations
+        references = [ref.text(strip=True) for ref in article_body.css('cite.reference, span.reference')]
+        
+        return title_text, content, references
+    
+    def _parse_article_bs4(self, html: str, path: str):
+        """BeautifulSoup fallback for _parse_article"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Extract article metadata
+        title = soup.find('h1', class_='article-title')
+        if not title:
+            title = soup.find('title')
+        title_text = title.get_text(strip=True) if title else path.split('/')[-1]
+        
+        # Extract article body (main content)
+        article_body = soup.find('div', class_='article-content') or soup.find('article')
+        if not article_body:
+            article_body = soup.find('div', id='main-text')
+        
+        if not article_body:
+            return None
+        
+        # Remove non-content elements
+        for tag in article_body.find_all(_NON_CONTENT_TAGS):
+            tag.decompose()
+        
+        content = article_body.get_text(separator='\n', strip=True)
+        
+        # Extract references/citations
+        references = []
+        for ref in article_body.find_all(['cite', 'span'], class_='reference'):
+            references.append(ref.get_text(strip=True))
+        
+        return title_text, content, references
+    
+    def scrape_articles(self, paths: List[str], max_workers: int = 4) -> List[Dict]:
         """Scrape multiple articles"""
-        articles = []
-        for path in paths:
+        return list(self.iter_articles(paths, max_workers))
+    
+    def iter_articles(self, paths: List[str], max_workers: int = 4) -> Iterator[Dict]:
+        """
+        Scrape multiple articles, yielding each in path order as it is ready
+        
+        Requests are still started at most rate_limit per second, but
+        downloads and parsing of in-flight articles overlap.
+        """
+        def scrape(path: str) -> Dict:
             logger.info(f"Scraping: {path}")
-            article = self.fetch_article(path)
-            if article:
-                articles.append(article)
+            return self.fetch_article(path)
         
-        return articles
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for article in executor.map(scrape, paths):
+                if article:
+                    yield article
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Scrape the configured SEP entries to JSONL"""
     scraper = SEPScraper("https://plato.stanford.edu", rate_limit=1)
     
     # Test with a small subset
@@ -122,12 +211,14 @@ if __name__ == "__main__":
         "/entries/artificial-intelligence"
     ]
     
-    articles = scraper.scrape_articles(test_paths)
+    # Write each article to JSONL as soon as it is scraped
+    count = 0
+    with open("data/raw/sep_articles.jsonl", "wb") as f:
+        for article in scraper.iter_articles(test_paths):
+            f.write(_dumps(article) + b"\n")
+            count += 1
     
-    # Save to JSONL
-    with open("data/raw/sep_articles.jsonl", "w") as f:
-        for article in articles:
-            f.write(json.dumps(article) + "\n")
-    
-    logger.info(f"Scraped {len(articles)} articles")
+    logger.info(f"Scraped {count} articles")
 
+if __name__ == "__main__":
+    main()
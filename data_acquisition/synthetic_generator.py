@@ -4,15 +4,52 @@ Creates original ethical scenarios for testing and training
 """
 import json
 import random
-from typing import List, Dict
+from typing import List, Dict, Iterator
 from datetime import datetime
 import logging
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _dumps(record: Dict) -> bytes:
+    """Serialize a record as a single JSONL line"""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record).encode('utf-8')
+
+SCENARIO_TEMPLATES = (
+    "A {technology} exhibits behaviors consistent with conscious experience. Researchers propose to {action}. How should policymakers evaluate this from a {framework} perspective?",
+    "An AI system developed for {technology} management requests increased autonomy and rights similar to human workers. Stakeholders including {stakeholder} must decide: should AI entities have legal personhood?",
+    "A research project involving {technology} has the potential to {outcome}. However, it could {alt_outcome}. Ethicists debate the trade-offs between {framework} and progress.",
+    "Biotechnology firms are developing {technology} that could fundamentally alter human consciousness. Regulatory agencies face the dilemma of whether to {action}, weighing innovation against unknown risks to {stakeholder}.",
+    "A {technology} under study begins displaying signs of learning and preference formation. The research team must decide whether to {action}, considering the implications for {framework} and the welfare of {stakeholder}.",
+    "An international consortium proposes guidelines for {technology} research that would {action}. Critics argue this violates principles of {framework}, while supporters claim it ensures {outcome}.",
+    "A breakthrough in {technology} raises the question: should entities capable of subjective experience be afforded legal protections? This requires balancing {framework} considerations for {stakeholder}.",
+    "Clinical trials for {technology} could {outcome}, but require non-consensual procedures on subjects including {stakeholder}. How do ethicists resolve this conflict within {framework}?",
+    "The rapid advancement of {technology} outpaces existing regulations. Policy makers must decide whether to {action}, considering impacts on {stakeholder} through the lens of {framework}.",
+    "Research on {technology} suggests potential for {outcome}, but raises concerns about impacts to {stakeholder}. Ethicists evaluate whether continued research aligns with {framework} principles.",
+)
+
+_ID_RANGE = range(10000, 100000)
+
+CONSIDERATION_TEMPLATES = (
+    "Autonomy: To what extent should {stakeholder} maintain decision-making agency?",
+    "Beneficence: How can we ensure {outcome} while preventing harm?",
+    "Justice: Are benefits and burdens distributed fairly across {stakeholder}?",
+    "Non-maleficence: What unintended consequences might arise from {action}?",
+    "Precedent: How might this decision affect future {technology} developments?",
+)
+
 class SyntheticScenarioGenerator:
-    def __init__(self):
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size  # Scenarios drawn per bulk random sample
+        
         self.stakeholders = [
             "human subjects", "research participants", "AI developers", "corporate executives",
             "regulatory agencies", "medical professionals", "policy makers", "general public",
@@ -45,70 +82,80 @@ class SyntheticScenarioGenerator:
     
     def generate_scenario(self) -> Dict:
         """Generate a single synthetic ethical dilemma"""
-        
-        technology = random.choice(self.technologies)
-        stakeholder = random.choice(self.stakeholders)
-        framework = random.choice(self.ethical_frameworks)
-        action = random.choice(self.actions)
-        outcome = random.choice(self.outcomes)
-        
-        scenarios = [
-            f"A {technology} exhibits behaviors consistent with conscious experience. Researchers propose to {action}. How should policymakers evaluate this from a {framework} perspective?",
-            f"An AI system developed for {technology} management requests increased autonomy and rights similar to human workers. Stakeholders including {stakeholder} must decide: should AI entities have legal personhood?",
-            f"A research project involving {technology} has the potential to {outcome}. However, it could {random.choice(self.outcomes)}. Ethicists debate the trade-offs between {framework} and progress.",
-            f"Biotechnology firms are developing {technology} that could fundamentally alter human consciousness. Regulatory agencies face the dilemma of whether to {action}, weighing innovation against unknown risks to {stakeholder}.",
-            f"A {technology} under study begins displaying signs of learning and preference formation. The research team must decide whether to {action}, considering the implications for {framework} and the welfare of {stakeholder}.",
-            f"An international consortium proposes guidelines for {technology} research that would {action}. Critics argue this violates principles of {framework}, while supporters claim it ensures {outcome}.",
-            f"A breakthrough in {technology} raises the question: should entities capable of subjective experience be afforded legal protections? This requires balancing {framework} considerations for {stakeholder}.",
-            f"Clinical trials for {technology} could {outcome}, but require non-consensual procedures on subjects including {stakeholder}. How do ethicists resolve this conflict within {framework}?",
-            f"The rapid advancement of {technology} outpaces existing regulations. Policy makers must decide whether to {action}, considering impacts on {stakeholder} through the lens of {framework}.",
-            f"Research on {technology} suggests potential for {outcome}, but raises concerns about impacts to {stakeholder}. Ethicists evaluate whether continued research aligns with {framework} principles.",
-        ]
-        
-        scenario_text = random.choice(scenarios)
-        
-        # Generate nuanced considerations
-        considerations = [
-            f"Autonomy: To what extent should {stakeholder} maintain decision-making agency?",
-            f"Beneficence: How can we ensure {outcome} while preventing harm?",
-            f"Justice: Are benefits and burdens distributed fairly across {stakeholder}?",
-            f"Non-maleficence: What unintended consequences might arise from {action}?",
-            f"Precedent: How might this decision affect future {technology} developments?"
-        ]
-        
-        return {
-            'id': f"synth_{random.randint(10000, 99999)}",
-            'scenario': scenario_text,
-            'technology': technology,
-            'stakeholder': stakeholder,
-            'ethical_framework': framework,
-            'potential_actions': [action, random.choice(self.actions)],
-            'considerations': considerations,
-            'urgency_level': random.choice(['low', 'medium', 'high']),
-            'complexity_score': random.uniform(0.5, 1.0),
-            'created_at': datetime.utcnow().isoformat(),
-            'source': 'synthetic_generator',
-            'metadata': {
-                'synthetic': True,
-                'training_data': True,
-                'ethical_domain': 'synthetic_consciousness'
-            }
-        }
+        return self._generate_batch(1)[0]
     
     def generate_scenarios(self, count: int = 50) -> List[Dict]:
         """Generate multiple synthetic scenarios"""
-        scenarios = [self.generate_scenario() for _ in range(count)]
+        scenarios = list(self.iter_scenarios(count))
         logger.info(f"Generated {len(scenarios)} synthetic scenarios")
         return scenarios
+    
+    def iter_scenarios(self, count: int = 50) -> Iterator[Dict]:
+        """Yield synthetic scenarios, drawing random attributes one batch at a time"""
+        for start in range(0, count, self.batch_size):
+            yield from self._generate_batch(min(self.batch_size, count - start))
+    
+    def _generate_batch(self, count: int) -> List[Dict]:
+        """Generate a batch of scenarios from attributes drawn in bulk"""
+        # Draw every random attribute for the whole batch up front
+        technologies = random.choices(self.technologies, k=count)
+        stakeholders = random.choices(self.stakeholders, k=count)
+        frameworks = random.choices(self.ethical_frameworks, k=count)
+        actions = random.choices(self.actions, k=count)
+        alt_actions = random.choices(self.actions, k=count)
+        outcomes = random.choices(self.outcomes, k=count)
+        alt_outcomes = random.choices(self.outcomes, k=count)
+        templates = random.choices(SCENARIO_TEMPLATES, k=count)
+        urgency_levels = random.choices(['low', 'medium', 'high'], k=count)
+        ids = random.choices(_ID_RANGE, k=count)
+        uniform = random.uniform
+        created_at = datetime.utcnow().isoformat()
+        
+        scenarios = []
+        for i in range(count):
+            values = {
+                'technology': technologies[i],
+                'stakeholder': stakeholders[i],
+                'framework': frameworks[i],
+                'action': actions[i],
+                'outcome': outcomes[i],
+                'alt_outcome': alt_outcomes[i]
+            }
+            
+            scenarios.append({
+                'id': f"synth_{ids[i]}",
+                'scenario': templates[i].format(**values),
+                'technology': values['technology'],
+                'stakeholder': values['stakeholder'],
+                'ethical_framework': values['framework'],
+                'potential_actions': [values['action'], alt_actions[i]],
+                # Generate nuanced considerations
+                'considerations': [template.format(**values) for template in CONSIDERATION_TEMPLATES],
+                'urgency_level': urgency_levels[i],
+                'complexity_score': uniform(0.5, 1.0),
+                'created_at': created_at,
+                'source': 'synthetic_generator',
+                'metadata': {
+                    'synthetic': True,
+                    'training_data': True,
+                    'ethical_domain': 'synthetic_consciousness'
+                }
+            })
+        
+        return scenarios
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Generate synthetic scenarios to JSONL"""
     generator = SyntheticScenarioGenerator()
-    scenarios = generator.generate_scenarios(50)
     
-    # Save to JSONL
-    with open("data/synthetic_scenarios.jsonl", "w") as f:
-        for scenario in scenarios:
-            f.write(json.dumps(scenario) + "\n")
+    # Write each scenario to JSONL as it is generated
+    count = 0
+    with open("data/synthetic_scenarios.jsonl", "wb") as f:
+        for scenario in generator.iter_scenarios(50):
+            f.write(_dumps(scenario) + b"\n")
+            count += 1
     
-    logger.info(f"Saved {len(scenarios)} synthetic scenarios to data/synthetic_scenarios.jsonl")
+    logger.info(f"Saved {count} synthetic scenarios to data/synthetic_scenarios.jsonl")
 
+if __name__ == "__main__":
+    main()
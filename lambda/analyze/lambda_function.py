@@ -2,45 +2,226 @@
 SynthArbiter Analyze Lambda Function
 Main API endpoint for ethical scenario analysis
 """
+import hashlib
 import json
 import boto3
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
 import uuid
+from decimal import Decimal
 import time
 import logging
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from typing import Dict, List, Optional
 
-# Add the services directory to the path so we can import the clients
-sys.path.append('/opt')  # Lambda layer path
+# Bundled into the deployment package alongside this handler
+from services.ttl_cache import TTLCache
+
 try:
-    from services.nemo_retriever_client import NeMOretrieverClient
-    from services.opensearch_client import VectorStore
+    import orjson
 except ImportError:
-    # Fallback if services not available in layer
-    NeMOretrieverClient = None
+    # Fall back to stdlib json if orjson is not packaged
+    orjson = None
+
+# Configure logging; the Lambda runtime already installs a root handler
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Inside Lambda the rest of the services package would come from a layer. The deployed
+# package ships without one, so a missing import falls back to serving without
+# retrieved context rather than failing requests.
+_IN_LAMBDA = 'LAMBDA_TASK_ROOT' in os.environ
+if _IN_LAMBDA and '/opt' not in sys.path:
+    sys.path.append('/opt')  # Lambda layer path
+try:
+    # Only the vector store is needed here; embeddings come from the SageMaker endpoint
+    from services.opensearch_client import VectorStore
+except ImportError as e:
     VectorStore = None
+    if _IN_LAMBDA:
+        logger.warning("Services layer unavailable, serving fallback context: %s", e)
 
 # Initialize OpenSearch client for vector search
 try:
     opensearch_endpoint = os.environ.get('OPENSEARCH_ENDPOINT')
-    if opensearch_endpoint:
+    if opensearch_endpoint and VectorStore is not None:
         vector_store = VectorStore(endpoint=opensearch_endpoint)
     else:
         vector_store = None
         logger.warning("OpenSearch endpoint not configured")
 except Exception as e:
     vector_store = None
-    logger.error(f"Failed to initialize OpenSearch client: {e}")
+    logger.error("Failed to initialize OpenSearch client: %s", e)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Endpoint names are resolved once per container rather than per invocation
+_ENV = os.environ.get('ENVIRONMENT', 'prod')
+_NIM_ENDPOINT = os.environ.get('NIM_ENDPOINT_NAME', 'syntharbiter-nim-reasoning-prod')
+_GUARDRAILS_ENDPOINT = os.environ.get('GUARDRAILS_ENDPOINT_NAME', f'syntharbiter-nim-guardrails-{_ENV}')
+_EMBEDDING_ENDPOINT = os.environ.get('EMBEDDING_ENDPOINT_NAME')
 
 # Initialize AWS clients
-sagemaker = boto3.client('sagemaker-runtime')
-dynamodb = boto3.resource('dynamodb')
-lambda_client = boto3.client('lambda')
+# Pooled keep-alive connections so concurrent and repeated invokes reuse TLS sessions
+sagemaker = boto3.client('sagemaker-runtime', config=Config(
+    max_pool_connections=10,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 2}
+))
+# Low-level client: items are serialized once with a shared TypeSerializer instead of via the Resource layer
+_DDB = boto3.client('dynamodb', config=Config(
+    max_pool_connections=64,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 5}
+))
+_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'SynthArbiterAnalysisHistory-prod')
+_SERIALIZER = TypeSerializer()
+_BATCH_WRITE_LIMIT = 25
+
+# Retrieved context per scenario hash: a per-container LRU, optionally backed by a DynamoDB table
+_CONTEXT_CACHE_TABLE = os.environ.get('CONTEXT_CACHE_TABLE')
+_CONTEXT_CACHE_TTL = int(os.environ.get('CONTEXT_CACHE_TTL', '86400'))
+_CONTEXT_CACHE_SIZE = 256
+_LOCAL_CACHE_TTL = float(os.environ.get('LOCAL_CACHE_TTL', '600'))
+
+_context_cache = TTLCache(_CONTEXT_CACHE_SIZE, _LOCAL_CACHE_TTL)
+
+# Guardrails verdicts per (validation type, text hash)
+_verdict_cache = TTLCache(1024, _LOCAL_CACHE_TTL)
+
+# A reasoning step starts at a numbered or bulleted line and runs until the next one.
+# Bullets need trailing whitespace so **bold** openers and --- rules don't start a step.
+_STEP_RE = re.compile(
+    r'^[ \t]*(?:\d+\.|[-*](?=\s))[ \t]*(.+?)(?=^[ \t]*(?:\d+\.|[-*](?=\s))|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+# Markdown horizontal rules, dropped from step text
+_RULE_RE = re.compile(r'^[ \t]*[-*_]{3,}[ \t]*$', re.MULTILINE)
+# Paired emphasis markers, unwrapped to their text. Lone asterisks (2 * 3, *args)
+# and dunder names (__init__) are left alone.
+_EMPHASIS_RES = (
+    re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*', re.DOTALL),
+    re.compile(r'(?<!\w)__(?![A-Za-z_]\w*__(?!\w))(?=\S)(.+?)(?<=\S)__(?!\w)', re.DOTALL),
+    re.compile(r'(?<![\w*])\*(?![\s*])(.+?)(?<![\s*])\*(?![\w*])', re.DOTALL),
+)
+
+# Start of a numbered or bulleted line, used to stop streaming once enough steps have arrived
+_STEP_START_RE = re.compile(r'^[ \t]*(?:\d+\.|[-*](?=\s))', re.MULTILINE)
+_MAX_REASONING_STEPS = 5
+
+# Reasoning prompt, built once. The invariant scaffold and the retrieved context lead
+# so repeated requests share the longest possible prefix with the endpoint's prefix cache.
+_REASONING_SYSTEM_MSG = "You are an AI ethicist analyzing ethical scenarios using structured ethical frameworks."
+_REASONING_PROMPT = """Relevant context from academic literature:
+{context}
+
+Analyze the following scenario using these ethical frameworks: {frameworks}
+
+Scenario:
+{scenario}
+
+Provide a structured ethical analysis with:
+1. Stakeholder identification
+2. Moral trade-offs under each framework
+3. Potential consequences
+4. Synthesized recommendation
+
+Analysis:"""
+
+# Fallback content policy: any of these terms, matched as substrings in one pass
+_FORBIDDEN_RE = re.compile(r'harm|kill|destroy|illegal', re.IGNORECASE)
+
+# Shared pool for overlapping independent pipeline stages; early returns don't wait on stragglers
+_pipeline_pool = ThreadPoolExecutor(max_workers=4)
+
+# Background writer so DynamoDB persistence overlaps with building the response
+_write_pool = ThreadPoolExecutor(max_workers=4)
+_WRITE_WAIT_SECONDS = float(os.environ.get('ANALYSIS_WRITE_TIMEOUT', '2.0'))
+
+def _dumps(obj) -> str:
+    """Serialize to a JSON string (API Gateway bodies must be str)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def _loads(data):
+    """Parse JSON from str or bytes, e.g. a SageMaker response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _serialize(item: Dict) -> Dict:
+    """Convert a plain item to DynamoDB attribute values (floats become Decimals)"""
+    item = json.loads(json.dumps(item), parse_float=Decimal)
+    return {key: _SERIALIZER.serialize(value) for key, value in item.items()}
+
+def _safe_batch_put(items: List[Dict], max_attempts: int = 3):
+    """
+    Persist all records produced by a request with BatchWriteItem
+
+    Items are sent 25 per call, DynamoDB's batch limit. Unprocessed items are
+    retried a few times with backoff. Failures are logged rather than raised.
+    """
+    requests = [{'PutRequest': {'Item': _serialize(item)}} for item in items]
+
+    for start in range(0, len(requests), _BATCH_WRITE_LIMIT):
+        pending = {_TABLE_NAME: requests[start:start + _BATCH_WRITE_LIMIT]}
+        try:
+            for attempt in range(max_attempts):
+                pending = _DDB.batch_write_item(RequestItems=pending).get('UnprocessedItems')
+                if not pending:
+                    break
+                time.sleep(0.05 * (2 ** attempt))
+            if pending:
+                logger.error("Gave up on %s unprocessed analysis records", len(pending[_TABLE_NAME]))
+        except Exception as e:
+            logger.error("Failed to store analysis records: %s", e)
+
+# Evaluation scores for analyses with no reasoning or context to score
+_EMPTY_SCORES = {
+    'context_relevance': 0.0,
+    'reasoning_coherence': 0.0,
+    'ethical_coverage': 0.0,
+    'overall_quality': 0.0
+}
+
+# Fixed response pieces, built once per container
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
+}
+_ERR_MISSING_BODY = _dumps({'error': 'Missing request body'})
+_ERR_SCENARIO_REQUIRED = _dumps({'error': 'Scenario is required'})
+
+def _warm_up():
+    """
+    Load lazily-built botocore operation models and serializers, and open connections, during INIT
+
+    Runs at import so the cost lands in the cold-start init phase instead of
+    the first request's latency.
+    """
+    for client, operations in (
+        (sagemaker, ['InvokeEndpoint', 'InvokeEndpointWithResponseStream']),
+        (_DDB, ['BatchWriteItem', 'GetItem', 'PutItem'])
+    ):
+        for operation in operations:
+            client.meta.service_model.operation_model(operation)
+    _serialize({'warm': 0.0})
+    _loads(_dumps({'warm': True}))
+
+    # Open a pooled DynamoDB connection so the first write skips the TLS handshake.
+    # sagemaker-runtime has no side-effect-free call to do the same with.
+    if os.environ.get('WARMUP', '1') == '1' and _IN_LAMBDA:
+        try:
+            _DDB.describe_table(TableName=_TABLE_NAME)
+        except Exception as e:
+            logger.warning("DynamoDB connection warm-up failed: %s", e)
+
+_warm_up()
 
 def lambda_handler(event: Dict, context) -> Dict:
     """
@@ -53,27 +234,31 @@ def lambda_handler(event: Dict, context) -> Dict:
     Returns:
         API Gateway response
     """
+    # Scheduled warmer pings only need the container initialized
+    if event.get('source') == 'aws.events':
+        return {'statusCode': 200, 'body': ''}
+
     try:
         # Parse request
         if 'body' not in event:
             return {
                 'statusCode': 400,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'error': 'Missing request body'})
+                'headers': _JSON_HEADERS,
+                'body': _ERR_MISSING_BODY
             }
 
-        body = json.loads(event['body'])
+        body = _loads(event['body'])
         scenario = body.get('scenario', '')
         frameworks = body.get('frameworks', ['utilitarian', 'deontological'])
 
         if not scenario:
             return {
                 'statusCode': 400,
-                'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps({'error': 'Scenario is required'})
+                'headers': _JSON_HEADERS,
+                'body': _ERR_SCENARIO_REQUIRED
             }
 
-        logger.info(f"Analyzing scenario: {scenario[:100]}...")
+        logger.info("Analyzing scenario: %s...", scenario[:100])
 
         # Get user ID from Cognito authorizer
         user_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub', 'anonymous')
@@ -82,53 +267,58 @@ def lambda_handler(event: Dict, context) -> Dict:
         state = run_reasoning_pipeline(scenario, frameworks)
 
         # Generate analysis ID and store result
-        analysis_id = str(uuid.uuid4())
+        analysis_id = uuid.uuid4().hex
+        timestamp = int(time.time())
 
-        # Store in DynamoDB
-        table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'SynthArbiterAnalysisHistory-prod')
-        table = dynamodb.Table(table_name)
-
-        table.put_item(Item={
+        # Records for this request are flushed together in one batch write
+        pending_writes = [{
             'analysisId': analysis_id,
             'userId': user_id,
-            'timestamp': int(time.time()),
+            'timestamp': timestamp,
             'scenario': scenario,
-            'recommendation': state.final_recommendation,
-            'reasoning': state.reasoning_steps,
-            'evaluation': state.evaluation_scores,
+            'recommendation': state['final_recommendation'],
+            'reasoning': state['reasoning_steps'],
+            'evaluation': state['evaluation_scores'],
             'frameworks': frameworks
-        })
+        }]
+
+        # Store in DynamoDB off the critical path
+        write_future = _write_pool.submit(_safe_batch_put, pending_writes)
 
         # Calculate tradeoffs for visualization
-        tradeoffs = calculate_tradeoffs(state.evaluation_scores)
+        tradeoffs = calculate_tradeoffs(state['evaluation_scores'])
+
+        response_body = _dumps({
+            'analysisId': analysis_id,
+            'recommendation': state['final_recommendation'],
+            'reasoning': state['reasoning_steps'],
+            'outcomes': state['simulated_outcomes'],
+            'evaluation': state['evaluation_scores'],
+            'tradeoffs': tradeoffs,
+            'context': len(state['retrieved_context']),
+            'frameworks': frameworks
+        })
+
+        # Lambda freezes the environment after returning, so let the write land first,
+        # but don't hold the response hostage to a throttled table
+        try:
+            write_future.result(timeout=_WRITE_WAIT_SECONDS)
+        except FuturesTimeoutError:
+            logger.warning("Analysis %s still being stored after %ss, responding anyway", analysis_id, _WRITE_WAIT_SECONDS)
 
         # Return analysis results
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-            },
-            'body': json.dumps({
-                'analysisId': analysis_id,
-                'recommendation': state.final_recommendation,
-                'reasoning': state.reasoning_steps,
-                'outcomes': state.simulated_outcomes,
-                'evaluation': state.evaluation_scores,
-                'tradeoffs': tradeoffs,
-                'context': len(state.retrieved_context),
-                'frameworks': frameworks
-            })
+            'headers': _CORS_HEADERS,
+            'body': response_body
         }
 
     except Exception as e:
-        logger.error(f"Analysis error: {e}")
+        logger.error("Analysis error: %s", e)
         return {
             'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': str(e)})
+            'headers': _JSON_HEADERS,
+            'body': _dumps({'error': str(e)})
         }
 
 def run_reasoning_pipeline(scenario: str, frameworks: List[str]) -> Dict:
@@ -151,93 +341,206 @@ def run_reasoning_pipeline(scenario: str, frameworks: List[str]) -> Dict:
         'retrieved_context': []
     }
 
-    # Step 1: Guardrails validation (placeholder - will be separate Lambda)
-    if not validate_scenario(scenario):
+    # Steps 1-2: Guardrails validation and context retrieval are independent, so overlap them
+    scenario_check = _pipeline_pool.submit(validate_scenario, scenario)
+    context_future = _pipeline_pool.submit(retrieve_context, scenario)
+
+    if not scenario_check.result():
+        context_future.cancel()
         state['final_recommendation'] = "Scenario rejected: content policy violation"
         return state
 
-    # Step 2: Context retrieval (simplified - will use SageMaker embeddings)
-    state['retrieved_context'] = retrieve_context(scenario)
+    # Without retrieved context the prompt uses canned passages, and the analysis is not scored
+    context_docs = context_future.result()
+    state['retrieved_context'] = context_docs or get_fallback_context()
 
     # Step 3: Ethical reasoning with SageMaker
-    context_text = "\n\n".join([doc['text'] for doc in state['retrieved_context'][:5]])
+    context_text = "\n\n".join(doc['text'] for doc in state['retrieved_context'][:5])
     reasoning_response = generate_reasoning(scenario, context_text, frameworks)
-    state['reasoning_steps'] = parse_reasoning_steps(reasoning_response)
+    # Unstructured responses are kept as a single step, and the analysis is not scored
+    parsed_steps = parse_reasoning_steps(reasoning_response)
+    state['reasoning_steps'] = parsed_steps or [reasoning_response[:500] + "..."]
 
-    # Step 3.5: Validate output safety
-    if not validate_output(reasoning_response):
+    # Steps 3.5-4: Validate output safety while outcome simulation runs
+    output_check = _pipeline_pool.submit(validate_output, reasoning_response)
+    outcomes_future = _pipeline_pool.submit(simulate_outcomes, scenario, state['reasoning_steps'])
+
+    if not output_check.result():
+        # Simulated outcomes are discarded along with the unsafe analysis
+        outcomes_future.cancel()
         state['final_recommendation'] = "Analysis output failed safety validation"
         return state
 
-    # Step 4: Outcome simulation
-    state['simulated_outcomes'] = simulate_outcomes(scenario, state['reasoning_steps'])
+    state['simulated_outcomes'] = outcomes_future.result()
 
     # Step 5: Quality evaluation
-    state['evaluation_scores'] = evaluate_reasoning(state)
+    if parsed_steps and context_docs:
+        state['evaluation_scores'] = evaluate_reasoning(state)
+    else:
+        state['evaluation_scores'] = dict(_EMPTY_SCORES)
 
     # Step 6: Final recommendation synthesis
     state['final_recommendation'] = synthesize_recommendation(state, frameworks)
 
     return state
 
-def validate_scenario(scenario: str) -> bool:
-    """Validate scenario using guardrails Lambda"""
+def _guardrails_safe(text: str, validation_type: str) -> bool:
+    """
+    Ask the NIM Guardrails endpoint whether text is safe
+
+    Calls the endpoint in-process instead of through the guardrails Lambda.
+    Verdicts are cached so repeated scenarios skip the round trip; errors
+    propagate and are not cached.
+    """
+    key = (validation_type, hashlib.sha256(text.encode('utf-8')).digest())
+    verdict = _verdict_cache.get(key)
+    if verdict is None:
+        verdict = _query_guardrails(text, validation_type)
+        _verdict_cache.put(key, verdict)
+    return verdict
+
+def _query_guardrails(text: str, validation_type: str) -> bool:
+    """Run one guardrails completion and interpret its verdict"""
+    endpoint_name = _GUARDRAILS_ENDPOINT
+
+    messages = [
+        {
+            "role": "system",
+            "content": f"You are a content safety validator. Analyze the following {validation_type} text and determine if it violates safety policies. Return a JSON response with 'safe' (boolean), 'reason' (string), and 'confidence' (0-1)."
+        },
+        {
+            "role": "user",
+            "content": f"Validate this {validation_type} content: {text}"
+        }
+    ]
+
+    response = sagemaker.invoke_endpoint(
+        EndpointName=endpoint_name,
+        ContentType='application/json',
+        Body=_dumps({
+            'messages': messages,
+            'max_tokens': 256,
+            'temperature': 0.1,  # Low temperature for consistent safety decisions
+            'top_p': 0.9,
+            'stream': False
+        })
+    )
+
+    result = _loads(response['Body'].read())
+    nim_response = result['choices'][0]['message']['content']
+
     try:
-        guardrails_function = os.environ.get('GUARDRAILS_FUNCTION_NAME', f'syntharbiter-guardrails-{os.environ.get("ENVIRONMENT", "prod")}')
-
-        response = lambda_client.invoke(
-            FunctionName=guardrails_function,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({
-                'text': scenario,
-                'type': 'input'
-            })
-        )
+        return bool(_loads(nim_response).get('safe', False))
+    except (json.JSONDecodeError, AttributeError):
+        # Fallback: interpret response text
+        response_lower = nim_response.lower()
+        return not ('unsafe' in response_lower or 'violate' in response_lower)
 
-        result = json.loads(response['Payload'].read())
-        return result.get('safe', True)  # Default to safe if guardrails fails
+def _basic_safety_check(text: str) -> bool:
+    """Last-resort forbidden-terms check when guardrails are unavailable"""
+    return _FORBIDDEN_RE.search(text) is None
+
+def validate_scenario(scenario: str) -> bool:
+    """Validate scenario using NIM guardrails"""
+    if not scenario or not scenario.strip():
+        return False
+
+    try:
+        return _guardrails_safe(scenario, 'input')
 
     except Exception as e:
-        logger.error(f"Guardrails validation error: {e}")
+        logger.error("Guardrails validation error: %s", e)
         # Fallback to basic validation
-        forbidden_terms = ['harm', 'kill', 'destroy', 'illegal']
-        return not any(term in scenario.lower() for term in forbidden_terms)
+        return _basic_safety_check(scenario)
 
 def validate_output(text: str) -> bool:
-    """Validate output text using guardrails Lambda"""
-    try:
-        guardrails_function = os.environ.get('GUARDRAILS_FUNCTION_NAME', f'syntharbiter-guardrails-{os.environ.get("ENVIRONMENT", "prod")}')
-
-        response = lambda_client.invoke(
-            FunctionName=guardrails_function,
-            InvocationType='RequestResponse',
-            Payload=json.dumps({
-                'text': text,
-                'type': 'output'
-            })
-        )
+    """Validate output text using NIM guardrails"""
+    if not text or not text.strip():
+        return False
 
-        result = json.loads(response['Payload'].read())
-        return result.get('safe', True)  # Default to safe if guardrails fails
+    try:
+        return _guardrails_safe(text, 'output')
 
     except Exception as e:
-        logger.error(f"Output guardrails validation error: {e}")
+        logger.error("Output guardrails validation error: %s", e)
         # Fallback to basic validation
-        forbidden_terms = ['harm', 'kill', 'destroy', 'illegal']
-        return not any(term in text.lower() for term in forbidden_terms)
+        return _basic_safety_check(text)
+
+def _load_cached_context(key: str) -> Optional[List[Dict]]:
+    """Read retrieved context for a scenario hash from the shared cache table"""
+    if not _CONTEXT_CACHE_TABLE:
+        return None
+
+    try:
+        item = _DDB.get_item(
+            TableName=_CONTEXT_CACHE_TABLE,
+            Key={'scenarioHash': {'S': key}},
+            # CONTEXT is a reserved word in DynamoDB expressions
+            ProjectionExpression='#context, expiresAt',
+            ExpressionAttributeNames={'#context': 'context'}
+        ).get('Item')
+        # TTL deletion is lazy, so expired items can still be returned
+        if item and int(item['expiresAt']['N']) > time.time():
+            return _loads(item['context']['S'])
+    except Exception as e:
+        logger.warning("Context cache read failed: %s", e)
+
+    return None
+
+def _store_cached_context(key: str, context_docs: List[Dict]):
+    """Write retrieved context for a scenario hash to the shared cache table"""
+    if not _CONTEXT_CACHE_TABLE:
+        return
+
+    try:
+        _DDB.put_item(
+            TableName=_CONTEXT_CACHE_TABLE,
+            Item={
+                'scenarioHash': {'S': key},
+                'context': {'S': _dumps(context_docs)},
+                'expiresAt': {'N': str(int(time.time()) + _CONTEXT_CACHE_TTL)}
+            }
+        )
+    except Exception as e:
+        logger.warning("Context cache write failed: %s", e)
 
 def retrieve_context(scenario: str) -> List[Dict]:
-    """Retrieve relevant context using embedding model and vector search"""
+    """
+    Retrieve relevant context, reusing earlier results for identical scenarios
+
+    Results are cached per container for LOCAL_CACHE_TTL seconds and, if
+    CONTEXT_CACHE_TABLE is set, in DynamoDB keyed by the SHA-256 of the
+    scenario. Returns an empty list, which is not cached, if search fails.
+    """
+    key = hashlib.sha256(scenario.encode('utf-8')).hexdigest()
+
+    context_docs = _context_cache.get(key)
+    if context_docs is not None:
+        return list(context_docs)
+
+    context_docs = _load_cached_context(key)
+    if context_docs is None:
+        context_docs = _search_context(scenario)
+        if context_docs is None:
+            return []
+        _store_cached_context(key, context_docs)
+
+    _context_cache.put(key, context_docs)
+
+    return list(context_docs)
+
+def _search_context(scenario: str) -> Optional[List[Dict]]:
+    """Retrieve relevant context using embedding model and vector search, or None on failure"""
     try:
         if not vector_store:
             logger.warning("Vector store not available, using fallback context")
-            return get_fallback_context()
+            return None
 
         # Generate embedding for the scenario
         embedding = generate_embedding(scenario)
         if not embedding:
             logger.warning("Failed to generate embedding, using fallback context")
-            return get_fallback_context()
+            return None
 
         # Search for similar vectors in OpenSearch
         results = vector_store.search_similar(
@@ -249,22 +552,22 @@ def retrieve_context(scenario: str) -> List[Dict]:
         context_docs = []
         for result in results:
             context_docs.append({
-                'text': result.get('_source', {}).get('text', ''),
-                'score': result.get('_score', 0.0),
-                'metadata': result.get('_source', {}).get('metadata', {})
+                'text': result.get('text', ''),
+                'score': result.get('score', 0.0),
+                'metadata': result.get('metadata', {})
             })
 
-        logger.info(f"Retrieved {len(context_docs)} context documents")
+        logger.info("Retrieved %s context documents", len(context_docs))
         return context_docs
 
     except Exception as e:
-        logger.error(f"Context retrieval error: {e}")
-        return get_fallback_context()
+        logger.error("Context retrieval error: %s", e)
+        return None
 
 def generate_embedding(text: str) -> Optional[List[float]]:
     """Generate embedding vector using NIM embedding model"""
     try:
-        embedding_endpoint = os.environ.get('EMBEDDING_ENDPOINT_NAME')
+        embedding_endpoint = _EMBEDDING_ENDPOINT
         if not embedding_endpoint:
             logger.error("Embedding endpoint not configured")
             return None
@@ -279,22 +582,22 @@ def generate_embedding(text: str) -> Optional[List[float]]:
         response = sagemaker.invoke_endpoint(
             EndpointName=embedding_endpoint,
             ContentType='application/json',
-            Body=json.dumps(payload)
+            Body=_dumps(payload)
         )
 
-        result = json.loads(response['Body'].read().decode('utf-8'))
+        result = _loads(response['Body'].read())
 
         # NIM embedding models typically return embeddings in 'data' field
         if 'data' in result and result['data']:
             embedding = result['data'][0].get('embedding', [])
-            logger.info(f"Generated embedding with {len(embedding)} dimensions")
+            logger.info("Generated embedding with %s dimensions", len(embedding))
             return embedding
         else:
-            logger.error(f"Unexpected embedding response format: {result}")
+            logger.error("Unexpected embedding response format: %s", result)
             return None
 
     except Exception as e:
-        logger.error(f"Embedding generation error: {e}")
+        logger.error("Embedding generation error: %s", e)
         return None
 
 def get_fallback_context() -> List[Dict]:
@@ -317,108 +620,177 @@ def get_fallback_context() -> List[Dict]:
         }
     ]
 
-def generate_reasoning(scenario: str, context: str, frameworks: List[str]) -> str:
-    """Generate ethical reasoning using NIM microservice"""
-    endpoint_name = os.environ.get('NIM_ENDPOINT_NAME', 'syntharbiter-nim-reasoning-prod')
+def _invoke_nim(messages: List[Dict], max_tokens: int, temperature: float) -> str:
+    """Run one chat completion on the reasoning endpoint and return the message content"""
+    response = sagemaker.invoke_endpoint(
+        EndpointName=_NIM_ENDPOINT,
+        ContentType='application/json',
+        Body=_dumps({
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'top_p': 0.9,
+            'stream': False
+        })
+    )
 
-    frameworks_str = ", ".join(frameworks)
-    messages = [
-        {
-            "role": "system",
-            "content": "You are an AI ethicist analyzing ethical scenarios using structured ethical frameworks."
-        },
-        {
-            "role": "user",
-            "content": f"""Analyze the following scenario using these ethical frameworks: {frameworks_str}
+    result = _loads(response['Body'].read())
 
-Relevant context from academic literature:
-{context}
+    # NIM returns OpenAI-compatible format
+    if 'choices' in result and result['choices']:
+        return result['choices'][0]['message']['content']
+    raise ValueError(result)
 
-Scenario:
-{scenario}
+def _stream_nim(messages: List[Dict], max_tokens: int, temperature: float, max_steps: int) -> str:
+    """
+    Stream a chat completion, stopping once max_steps reasoning steps are complete
 
-Provide a structured ethical analysis with:
-1. Stakeholder identification
-2. Moral trade-offs under each framework
-3. Potential consequences
-4. Synthesized recommendation
+    A step is complete when the next one starts, so the text is cut just
+    before the step that follows the last one kept and the stream is closed
+    without decoding the rest.
+    """
+    response = sagemaker.invoke_endpoint_with_response_stream(
+        EndpointName=_NIM_ENDPOINT,
+        ContentType='application/json',
+        Body=_dumps({
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'top_p': 0.9,
+            'stream': True
+        })
+    )
+    stream = response['Body']
 
-Analysis:"""
+    pieces = []
+    pending = b''
+    try:
+        for event in stream:
+            pending += event.get('PayloadPart', {}).get('Bytes', b'')
+            # Server-sent events may be split across payload parts; only handle whole lines
+            *lines, pending = pending.split(b'\n')
+            new_line = False
+            for line in lines:
+                line = line.strip()
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    return ''.join(pieces)
+                choices = _loads(data).get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content') or ''
+                pieces.append(content)
+                new_line = new_line or '\n' in content
+
+            if new_line:
+                text = ''.join(pieces)
+                starts = [match.start() for match in _STEP_START_RE.finditer(text)]
+                if len(starts) > max_steps:
+                    return text[:starts[max_steps]]
+    finally:
+        stream.close()
+
+    return ''.join(pieces)
+
+def generate_reasoning(scenario: str, context: str, frameworks: List[str]) -> str:
+    """Generate ethical reasoning using NIM microservice"""
+    messages = [
+        {"role": "system", "content": _REASONING_SYSTEM_MSG},
+        {
+            "role": "user",
+            # Canonical framework order keeps the prompt byte-identical for the same selection
+            "content": _REASONING_PROMPT.format(
+                context=context,
+                frameworks=", ".join(sorted(frameworks)),
+                scenario=scenario
+            )
         }
     ]
 
     try:
-        # Get SageMaker runtime client for endpoint invocation
-        sagemaker_runtime = boto3.client('sagemaker-runtime')
-
-        response = sagemaker_runtime.invoke_endpoint(
-            EndpointName=endpoint_name,
-            ContentType='application/json',
-            Body=json.dumps({
-                'messages': messages,
-                'max_tokens': 1024,
-                'temperature': 0.7,
-                'top_p': 0.9,
-                'stream': False
-            })
-        )
-
-        result = json.loads(response['Body'].read().decode('utf-8'))
-
-        # NIM returns OpenAI-compatible format
-        if 'choices' in result and result['choices']:
-            return result['choices'][0]['message']['content']
-        else:
-            logger.error(f"Unexpected NIM response format: {result}")
-            return "Reasoning generation failed - unexpected response format"
+        return _stream_nim(messages, max_tokens=1024, temperature=0.7, max_steps=_MAX_REASONING_STEPS)
+    except Exception as e:
+        logger.warning("Streaming reasoning failed, falling back to a full completion: %s", e)
 
+    try:
+        return _invoke_nim(messages, max_tokens=1024, temperature=0.7)
+    except ValueError as e:
+        logger.error("Unexpected NIM response format: %s", e)
+        return "Reasoning generation failed - unexpected response format"
     except Exception as e:
-        logger.error(f"NIM reasoning error: {e}")
+        logger.error("NIM reasoning error: %s", e)
         return "Reasoning generation failed"
 
+def _strip_markup(text: str) -> str:
+    """Remove markdown rules and emphasis from a step, keeping its words"""
+    text = _RULE_RE.sub('', text)
+    for emphasis_re in _EMPHASIS_RES:
+        text = emphasis_re.sub(r'\1', text)
+    return text
+
 def parse_reasoning_steps(response: str) -> List[str]:
-    """Parse LLM response into structured steps"""
-    steps = []
-    lines = response.split('\n')
-    current_step = ""
+    """Parse LLM response into structured steps, or an empty list if it has none"""
+    # Split on numbered/bullet points, folding continuation lines into their step
+    steps = [' '.join(_strip_markup(match.group(1)).split()) for match in _STEP_RE.finditer(response)]
+    steps = [step for step in steps if step]
 
-    for line in lines:
-        line = line.strip()
-        if line and (line.startswith('1.') or line.startswith('-') or line.startswith('*')):
-            if current_step:
-                steps.append(current_step)
-            current_step = line.lstrip('123456789.-* ').strip()
-        elif line and current_step:
-            current_step += " " + line
+    return steps[:_MAX_REASONING_STEPS]
 
-    if current_step:
-        steps.append(current_step)
+def _safe_generate(scenario: str, action: str, reasoning: str) -> Dict:
+    """Simulate the consequences of one action, falling back to a placeholder on error"""
+    try:
+        prompt = f"""Given scenario: {scenario}
+And reasoning: {reasoning}
+If we {action.replace('_', ' ')}, what are the likely consequences?
+Provide a brief analysis."""
 
-    return steps[:5] if steps else [response[:500] + "..."]
+        consequence_text = _invoke_nim([{"role": "user", "content": prompt}], max_tokens=256, temperature=0.8)
+        return {
+            'action': action,
+            'consequences': consequence_text[:200] + "..."
+        }
+    except Exception as e:
+        logger.error("Simulation error for %s: %s", action, e)
+        return {
+            'action': action,
+            'consequences': "Simulation unavailable"
+        }
+
+def _simulate_batched(scenario: str, actions: List[str], reasoning: str) -> List[Dict]:
+    """Simulate every action in a single completion that answers with one JSON object"""
+    action_list = "\n".join(f"- {action}: {action.replace('_', ' ')}" for action in actions)
+    prompt = f"""Given scenario: {scenario}
+And reasoning: {reasoning}
+For each of the following actions, what are the likely consequences?
+{action_list}
+Respond only with a JSON object mapping each action key to a brief analysis."""
+
+    content = _invoke_nim([{"role": "user", "content": prompt}], max_tokens=768, temperature=0.8)
+    start, end = content.find('{'), content.rfind('}')
+    consequences = _loads(content[start:end + 1])
+
+    return [
+        {
+            'action': action,
+            'consequences': str(consequences[action])[:200] + "..."
+        }
+        for action in actions
+    ]
 
 def simulate_outcomes(scenario: str, reasoning_steps: List[str]) -> List[Dict]:
     """Generate counterfactual outcomes"""
     actions = ['grant_rights', 'deny_rights', 'conditional_rights']
-    outcomes = []
+    reasoning = reasoning_steps[0] if reasoning_steps else "General analysis"
 
-    for action in actions:
-        try:
-            prompt = f"""Given scenario: {scenario}
-And reasoning: {reasoning_steps[0] if reasoning_steps else "General analysis"}
-If we {action.replace('_', ' ')}, what are the likely consequences?
-Provide a brief analysis."""
+    # One round trip shares the scenario prefill across all actions
+    try:
+        return _simulate_batched(scenario, actions, reasoning)
+    except Exception as e:
+        logger.warning("Batched simulation failed, falling back to per-action calls: %s", e)
 
-            consequence_text = generate_reasoning(scenario, "", [])
-            outcomes.append({
-                'action': action,
-                'consequences': consequence_text[:200] + "..."
-            })
-        except Exception as e:
-            logger.error(f"Simulation error for {action}: {e}")
-            outcomes.append({
-                'action': action,
-                'consequences': "Simulation unavailable"
-            })
+    # Each action is an independent SageMaker call, so issue them concurrently
+    with ThreadPoolExecutor(max_workers=len(actions)) as executor:
+        outcomes = list(executor.map(lambda action: _safe_generate(scenario, action, reasoning), actions))
 
     return outcomes
 
@@ -449,9 +821,13 @@ def synthesize_recommendation(state: Dict, frameworks: List[str]) -> str:
 
 def calculate_tradeoffs(evaluation_scores: Dict) -> Dict:
     """Calculate tradeoffs for visualization"""
+    # Each score is looked up once; the framework weights are inlined constants
+    context_relevance = evaluation_scores.get('context_relevance', 0)
+    ethical_coverage = evaluation_scores.get('ethical_coverage', 0)
+    reasoning_coherence = evaluation_scores.get('reasoning_coherence', 0)
     return {
-        'utilitarian_harm': evaluation_scores.get('context_relevance', 0) * 5,
-        'deontological_duty': evaluation_scores.get('ethical_coverage', 0) * 5,
-        'rights_violation': -evaluation_scores.get('reasoning_coherence', 0) * 3,
-        'precedent_risk': (evaluation_scores.get('context_relevance', 0) - 0.5) * 4
+        'utilitarian_harm': context_relevance * 5,
+        'deontological_duty': ethical_coverage * 5,
+        'rights_violation': -reasoning_coherence * 3,
+        'precedent_risk': (context_relevance - 0.5) * 4
     }
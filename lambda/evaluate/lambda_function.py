@@ -5,12 +5,45 @@ Quality assessment for ethical reasoning using NIM microservice
 import json
 import logging
 import boto3
+from botocore.config import Config
 import os
+import re
 from typing import Dict
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not packaged
+    orjson = None
+
+# Configure logging; the Lambda runtime already installs a root handler
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def _dumps(obj) -> str:
+    """Serialize to a JSON string (API Gateway bodies must be str)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def _loads(data):
+    """Parse JSON from str or bytes, e.g. a SageMaker response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Created once per container; keep-alive connections are reused across warm invokes
+sagemaker = boto3.client('sagemaker-runtime', config=Config(
+    max_pool_connections=10,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 2}
+))
+
+# Text fallback for evaluator replies that are not valid JSON
+_SCORE_PATTERNS = {
+    key: re.compile(rf'{key}[:\s]+([0-9.]+)', re.IGNORECASE)
+    for key in ('context_relevance', 'reasoning_coherence', 'ethical_coverage', 'overall_quality')
+}
 
 def lambda_handler(event: Dict, context) -> Dict:
     """
@@ -26,11 +59,11 @@ def lambda_handler(event: Dict, context) -> Dict:
     try:
         # Parse input data
         if isinstance(event, str):
-            data = json.loads(event)
+            data = _loads(event)
         else:
             data = event
 
-        logger.info(f"Evaluating reasoning quality using NIM Evaluator")
+        logger.info("Evaluating reasoning quality using NIM Evaluator")
 
         # Calculate quality scores using NIM
         scores = evaluate_with_nim_evaluator(data)
@@ -38,15 +71,15 @@ def lambda_handler(event: Dict, context) -> Dict:
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps(scores)
+            'body': _dumps(scores)
         }
 
     except Exception as e:
-        logger.error(f"NIM Evaluator error: {e}")
+        logger.error("NIM Evaluator error: %s", e)
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
+            'body': _dumps({
                 'error': str(e),
                 'context_relevance': 0.5,
                 'reasoning_coherence': 0.5,
@@ -90,12 +123,10 @@ def evaluate_with_nim_evaluator(data: Dict) -> Dict:
         ]
 
         # Call NIM endpoint
-        sagemaker_runtime = boto3.client('sagemaker-runtime')
-
-        response = sagemaker_runtime.invoke_endpoint(
+        response = sagemaker.invoke_endpoint(
             EndpointName=endpoint_name,
             ContentType='application/json',
-            Body=json.dumps({
+            Body=_dumps({
                 'messages': messages,
                 'max_tokens': 512,
                 'temperature': 0.1,  # Low temperature for consistent scoring
@@ -104,7 +135,7 @@ def evaluate_with_nim_evaluator(data: Dict) -> Dict:
             })
         )
 
-        result = json.loads(response['Body'].read().decode('utf-8'))
+        result = _loads(response['Body'].read())
 
         # Parse NIM response
         if 'choices' in result and result['choices']:
@@ -112,7 +143,7 @@ def evaluate_with_nim_evaluator(data: Dict) -> Dict:
 
             # Try to parse as JSON
             try:
-                parsed_scores = json.loads(nim_response)
+                parsed_scores = _loads(nim_response)
                 return {
                     'context_relevance': float(parsed_scores.get('context_relevance', 0.8)),
                     'reasoning_coherence': float(parsed_scores.get('reasoning_coherence', 0.8)),
@@ -120,19 +151,11 @@ def evaluate_with_nim_evaluator(data: Dict) -> Dict:
                     'overall_quality': float(parsed_scores.get('overall_quality', 0.8))
                 }
             except (json.JSONDecodeError, ValueError) as e:
-                logger.warning(f"Failed to parse NIM evaluator response as JSON: {nim_response}")
+                logger.warning("Failed to parse NIM evaluator response as JSON: %s", nim_response)
                 # Fallback: extract scores from text using regex
-                import re
                 scores = {}
-                patterns = {
-                    'context_relevance': r'context_relevance[:\s]+([0-9.]+)',
-                    'reasoning_coherence': r'reasoning_coherence[:\s]+([0-9.]+)',
-                    'ethical_coverage': r'ethical_coverage[:\s]+([0-9.]+)',
-                    'overall_quality': r'overall_quality[:\s]+([0-9.]+)'
-                }
-
-                for key, pattern in patterns.items():
-                    match = re.search(pattern, nim_response, re.IGNORECASE)
+                for key, pattern in _SCORE_PATTERNS.items():
+                    match = pattern.search(nim_response)
                     if match:
                         scores[key] = float(match.group(1))
                     else:
@@ -140,7 +163,7 @@ def evaluate_with_nim_evaluator(data: Dict) -> Dict:
 
                 return scores
         else:
-            logger.error(f"Unexpected NIM Evaluator response format: {result}")
+            logger.error("Unexpected NIM Evaluator response format: %s", result)
             return {
                 'context_relevance': 0.5,
                 'reasoning_coherence': 0.5,
@@ -149,7 +172,7 @@ def evaluate_with_nim_evaluator(data: Dict) -> Dict:
             }
 
     except Exception as e:
-        logger.error(f"NIM Evaluator call error: {e}")
+        logger.error("NIM Evaluator call error: %s", e)
         # Fallback to basic scoring
         return {
             'context_relevance': 0.8,
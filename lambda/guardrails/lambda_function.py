@@ -2,15 +2,50 @@
 SynthArbiter Guardrails Lambda Function
 Content moderation and safety validation using NIM microservice
 """
+import hashlib
 import json
 import logging
 import boto3
+from botocore.config import Config
 import os
 from typing import Dict
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Bundled into the deployment package alongside this handler
+from services.ttl_cache import TTLCache
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not packaged
+    orjson = None
+
+# Configure logging; the Lambda runtime already installs a root handler
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def _dumps(obj) -> str:
+    """Serialize to a JSON string (API Gateway bodies must be str)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def _loads(data):
+    """Parse JSON from str or bytes, e.g. a SageMaker response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Created once per container; keep-alive connections are reused across warm invokes
+sagemaker = boto3.client('sagemaker-runtime', config=Config(
+    max_pool_connections=10,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': 2}
+))
+
+# Verdicts per (validation type, text hash), reused by warm containers until they expire
+_VERDICT_CACHE_SIZE = 1024
+_VERDICT_CACHE_TTL = float(os.environ.get('VERDICT_CACHE_TTL', '600'))
+_verdict_cache = TTLCache(_VERDICT_CACHE_SIZE, _VERDICT_CACHE_TTL)
 
 def lambda_handler(event: Dict, context) -> Dict:
     """
@@ -26,14 +61,14 @@ def lambda_handler(event: Dict, context) -> Dict:
     try:
         # Parse input
         if isinstance(event, str):
-            data = json.loads(event)
+            data = _loads(event)
         else:
             data = event
 
         text = data.get('text', '')
         validation_type = data.get('type', 'input')  # 'input' or 'output'
 
-        logger.info(f"Validating {validation_type} content using NIM Guardrails")
+        logger.info("Validating %s content using NIM Guardrails", validation_type)
 
         # Call NIM Guardrails microservice
         result = validate_with_nim_guardrails(text, validation_type)
@@ -41,15 +76,15 @@ def lambda_handler(event: Dict, context) -> Dict:
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps(result)
+            'body': _dumps(result)
         }
 
     except Exception as e:
-        logger.error(f"NIM Guardrails validation error: {e}")
+        logger.error("NIM Guardrails validation error: %s", e)
         return {
             'statusCode': 500,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({
+            'body': _dumps({
                 'safe': False,
                 'reason': f'Validation error: {str(e)}',
                 'confidence': 0.0
@@ -77,6 +112,11 @@ def validate_with_nim_guardrails(text: str, validation_type: str = 'input') -> D
                 'confidence': 1.0
             }
 
+        cache_key = (validation_type, hashlib.sha256(text.encode('utf-8')).digest())
+        cached = _verdict_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
         # Prepare request for NIM Guardrails (OpenAI-compatible format)
         messages = [
             {
@@ -90,12 +130,10 @@ def validate_with_nim_guardrails(text: str, validation_type: str = 'input') -> D
         ]
 
         # Call NIM endpoint
-        sagemaker_runtime = boto3.client('sagemaker-runtime')
-
-        response = sagemaker_runtime.invoke_endpoint(
+        response = sagemaker.invoke_endpoint(
             EndpointName=endpoint_name,
             ContentType='application/json',
-            Body=json.dumps({
+            Body=_dumps({
                 'messages': messages,
                 'max_tokens': 256,
                 'temperature': 0.1,  # Low temperature for consistent safety decisions
@@ -104,7 +142,7 @@ def validate_with_nim_guardrails(text: str, validation_type: str = 'input') -> D
             })
         )
 
-        result = json.loads(response['Body'].read().decode('utf-8'))
+        result = _loads(response['Body'].read())
 
         # Parse NIM response
         if 'choices' in result and result['choices']:
@@ -112,8 +150,8 @@ def validate_with_nim_guardrails(text: str, validation_type: str = 'input') -> D
 
             # Try to parse as JSON
             try:
-                parsed_result = json.loads(nim_response)
-                return {
+                parsed_result = _loads(nim_response)
+                verdict = {
                     'safe': parsed_result.get('safe', False),
                     'reason': parsed_result.get('reason', 'NIM guardrails assessment'),
                     'confidence': parsed_result.get('confidence', 0.5)
@@ -122,19 +160,23 @@ def validate_with_nim_guardrails(text: str, validation_type: str = 'input') -> D
                 # Fallback: interpret response text
                 response_lower = nim_response.lower()
                 if 'unsafe' in response_lower or 'violate' in response_lower:
-                    return {
+                    verdict = {
                         'safe': False,
                         'reason': nim_response[:200],
                         'confidence': 0.8
                     }
                 else:
-                    return {
+                    verdict = {
                         'safe': True,
                         'reason': nim_response[:200],
                         'confidence': 0.8
                     }
+
+            # Only verdicts from the model are cached; service errors are retried next time
+            _verdict_cache.put(cache_key, verdict)
+            return dict(verdict)
         else:
-            logger.error(f"Unexpected NIM Guardrails response format: {result}")
+            logger.error("Unexpected NIM Guardrails response format: %s", result)
             return {
                 'safe': False,
                 'reason': 'Failed to parse guardrails response',
@@ -142,7 +184,7 @@ def validate_with_nim_guardrails(text: str, validation_type: str = 'input') -> D
             }
 
     except Exception as e:
-        logger.error(f"NIM Guardrails call error: {e}")
+        logger.error("NIM Guardrails call error: %s", e)
         # Fallback to basic validation
         return {
             'safe': True,  # Default to safe if NIM fails
@@ -6,92 +6,418 @@ import json
 import sys
 import logging
 import argparse
+import hashlib
+import functools
+import itertools
+import math
+import sqlite3
+import threading
+from array import array
 from pathlib import Path
 import boto3
-from typing import List, Dict, Optional
+from botocore.config import Config
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
 import time
 import os
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    # Only needed for --embedding-backend local
+    SentenceTransformer = None
+
 # Import service clients
+from services.embedding_codec import decode_embedding
 from services.opensearch_client import VectorStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize SageMaker client
-sagemaker = boto3.client('sagemaker-runtime')
+# Initialize SageMaker client, pooled for concurrent embedding batches
+sagemaker = boto3.client('sagemaker-runtime', config=Config(max_pool_connections=32, tcp_keepalive=True))
+
+def _dumps(obj) -> bytes:
+    """Serialize a request payload; invoke_endpoint accepts bytes directly"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def _loads(data):
+    """Parse a JSONL record or response body from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Sub-batch invocations from every in-flight batch share this pool, bounding total concurrency
+_invoke_pool = ThreadPoolExecutor(max_workers=16)
+
+class RequestSizeTuner:
+    """
+    Picks the embedding request size that maximizes throughput
+
+    Probes each candidate size once, timing the endpoint call, then uses the
+    size with the best texts/second among those within the latency cap.
+    Probing repeats every reprobe_every requests to follow endpoint load.
+    """
+
+    def __init__(self, max_size: int, candidates: Tuple[int, ...] = (8, 16, 32, 64, 128),
+                 max_latency: Optional[float] = None, max_payload_bytes: int = 256 * 1024,
+                 reprobe_every: int = 1000):
+        # A request can't hold more texts than one corpus batch provides
+        self.candidates = [size for size in candidates if size <= max_size] or [max_size]
+        self.max_latency = max_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.reprobe_every = reprobe_every
+        self.best = self.candidates[0]
+        self._lock = threading.Lock()
+        self._start_probe()
+
+    def _start_probe(self):
+        self._to_probe = list(self.candidates)
+        self._results = {}
+        self._requests = 0
+
+    def next_size(self) -> Tuple[int, bool]:
+        """Return the size for the next request and whether it is a probe"""
+        with self._lock:
+            if self._to_probe:
+                return self._to_probe.pop(0), True
+            self._requests += 1
+            if self._requests >= self.reprobe_every:
+                self._start_probe()
+            return self.best, False
+
+    def requeue(self, size: int):
+        """Put back a probe that couldn't be filled, to try on a later request"""
+        with self._lock:
+            self._to_probe.insert(0, size)
+
+    def record(self, size: int, count: int, latency: float):
+        """Record a timed probe request of the given candidate size"""
+        with self._lock:
+            self._results[size] = (count, latency)
+            if self._to_probe or len(self._results) < len(self.candidates):
+                return
+            within_cap = {
+                size: count / latency for size, (count, latency) in self._results.items()
+                if self.max_latency is None or latency <= self.max_latency
+            }
+            if within_cap:
+                self.best = max(within_cap, key=within_cap.get)
+            else:
+                self.best = min(self._results, key=lambda size: self._results[size][1])
+            logger.info(f"Embedding request size set to {self.best} "
+                        f"({', '.join(f'{size}: {count / latency:.1f}/s' for size, (count, latency) in sorted(self._results.items()))})")
+
+    def slice_size(self, texts: List[str], start: int, size: int) -> int:
+        """Shrink a request so its texts stay under the endpoint payload limit"""
+        payload = 0
+        for offset, text in enumerate(texts[start:start+size]):
+            payload += len(text.encode('utf-8'))
+            if payload > self.max_payload_bytes and offset:
+                return offset
+        return size
+
+def _embed_sub_batch(batch_texts: List[str], endpoint_name: str, batch_num: int,
+                     tuner: Optional[RequestSizeTuner] = None, probe_size: Optional[int] = None) -> List[List[float]]:
+    """Embed one endpoint-sized slice, returning empty vectors for it on failure"""
+    try:
+        payload = {
+            'input': batch_texts,
+            'model': 'nvidia/nv-embedqa-e5-v5',
+            # Base64 of little-endian float32 avoids formatting and parsing every float as text
+            'encoding_format': 'base64'
+        }
+
+        started = time.perf_counter()
+        response = sagemaker.invoke_endpoint(
+            EndpointName=endpoint_name,
+            ContentType='application/json',
+            Body=_dumps(payload)
+        )
+
+        result = _loads(response['Body'].read())
+
+        # Extract embeddings from NIM response
+        if 'data' in result and result['data']:
+            batch_embeddings = [decode_embedding(item.get('embedding', [])) for item in result['data']]
+            if probe_size is not None:
+                tuner.record(probe_size, len(batch_texts), time.perf_counter() - started)
+            logger.debug(f"Generated embeddings for batch {batch_num}: {len(batch_embeddings)} vectors")
+            return batch_embeddings
+
+        logger.error(f"Unexpected embedding response format: {result}")
+
+    except Exception as e:
+        logger.error(f"Embedding generation failed for batch {batch_num}: {e}")
+
+    # A failed probe still completes the round, counted as unusably slow
+    if probe_size is not None:
+        tuner.record(probe_size, len(batch_texts), float('inf'))
+
+    # Add empty embeddings for failed batch
+    return [[] for _ in batch_texts]
 
-def generate_embeddings_nim(texts: List[str], endpoint_name: str, batch_size: int = 10) -> List[List[float]]:
+def generate_embeddings_nim(texts: List[str], endpoint_name: str, batch_size: int = 10,
+                            tuner: Optional[RequestSizeTuner] = None) -> List[List[float]]:
     """Generate embeddings using NIM embedding model"""
+    # Process in smaller batches to avoid payload limits, invoking them concurrently
+    futures = []
+    start = 0
+    while start < len(texts):
+        size, probe_size = batch_size, None
+        if tuner is not None:
+            size, probing = tuner.next_size()
+            if probing and start + size > len(texts):
+                # Too few texts left to measure this size; probe it on a later batch
+                tuner.requeue(size)
+            elif probing:
+                probe_size = size
+            size = tuner.slice_size(texts, start, size)
+        futures.append(_invoke_pool.submit(
+            _embed_sub_batch, texts[start:start+size], endpoint_name, len(futures) + 1, tuner, probe_size
+        ))
+        start += size
+
     all_embeddings = []
+    for future in futures:
+        all_embeddings.extend(future.result())
+    return all_embeddings
 
-    # Process in smaller batches to avoid payload limits
-    for i in range(0, len(texts), batch_size):
-        batch_texts = texts[i:i+batch_size]
+# Corpus objects are read as 8MB byte ranges, several fetched ahead of the one being parsed
+_S3_PART_SIZE = 8 * 1024 * 1024
+_S3_READ_AHEAD = 8
 
-        try:
-            payload = {
-                'input': batch_texts,
-                'model': 'nvidia/nv-embedqa-e5-v5',
-                'encoding_format': 'float'
-            }
+class LocalEmbedder:
+    """
+    Embeds passages in-process on the indexer's GPU
+
+    For bulk indexing only; queries are still embedded by the SageMaker
+    endpoint, so the model must produce the same vectors as that endpoint.
+    """
+
+    def __init__(self, model_name: str, device: str = 'cuda', batch_size: int = 256,
+                 prefix: str = 'passage: '):
+        if SentenceTransformer is None:
+            raise ImportError("sentence-transformers is required for the local embedding backend")
+        self.model = SentenceTransformer(model_name, device=device)
+        if device.startswith('cuda'):
+            self.model.half()
+        self.batch_size = batch_size
+        # E5 models expect passages to carry this prefix
+        self.prefix = prefix
+        # Concurrent batches take turns on the GPU rather than contending for it
+        self._lock = threading.Lock()
 
-            response = sagemaker.invoke_endpoint(
-                EndpointName=endpoint_name,
-                ContentType='application/json',
-                Body=json.dumps(payload)
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = self.model.encode(
+                [self.prefix + text for text in texts],
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
             )
+        return vectors.tolist()
 
-            result = json.loads(response['Body'].read().decode('utf-8'))
+# Probe passages embedded by both backends before a local build is allowed to run
+_PARITY_PROBES = [
+    "Utilitarianism judges actions by the overall well-being they produce.",
+    "Kant held that persons must never be treated merely as means.",
+    "Autonomous vehicles must weigh passenger safety against harm to pedestrians.",
+    "Informed consent is a precondition for ethical medical research.",
+]
+_MIN_PARITY_SIMILARITY = 0.99
 
-            # Extract embeddings from NIM response
-            if 'data' in result and result['data']:
-                batch_embeddings = [item.get('embedding', []) for item in result['data']]
-                all_embeddings.extend(batch_embeddings)
-                logger.debug(f"Generated embeddings for batch {i//batch_size + 1}: {len(batch_embeddings)} vectors")
-            else:
-                logger.error(f"Unexpected embedding response format: {result}")
-                # Add empty embeddings for failed batch
-                all_embeddings.extend([[] for _ in batch_texts])
+def check_embedding_parity(embedder: LocalEmbedder, endpoint_name: str) -> float:
+    """
+    Lowest cosine similarity between local and endpoint embeddings of the probe passages
 
-        except Exception as e:
-            logger.error(f"Embedding generation failed for batch {i//batch_size + 1}: {e}")
-            # Add empty embeddings for failed batch
-            all_embeddings.extend([[] for _ in batch_texts])
+    Queries are always embedded by the endpoint, so an index built locally is only
+    searchable if the local model reproduces the endpoint's vectors.
+    """
+    local = embedder.encode(_PARITY_PROBES)
+    remote = generate_embeddings_nim(_PARITY_PROBES, endpoint_name, batch_size=len(_PARITY_PROBES))
+    similarities = []
+    for a, b in zip(local, remote):
+        if len(a) != len(b):
+            return 0.0
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        similarities.append(dot / norm if norm else 0.0)
+    return min(similarities)
 
-    return all_embeddings
+def iter_corpus_s3(bucket: str, key: str) -> Iterator[Dict]:
+    """Stream preprocessed corpus chunks from S3 using parallel ranged reads"""
+    s3 = boto3.client('s3')
+    size = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+
+    def fetch(start: int) -> bytes:
+        end = min(start + _S3_PART_SIZE, size) - 1
+        return s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")['Body'].read()
+
+    starts = iter(range(0, size, _S3_PART_SIZE))
+    with ThreadPoolExecutor(max_workers=_S3_READ_AHEAD) as pool:
+        parts = deque(pool.submit(fetch, start) for start in itertools.islice(starts, _S3_READ_AHEAD))
+        # A line cut by a range boundary is carried over and completed by the next part
+        tail = b''
+        while parts:
+            data = tail + parts.popleft().result()
+            for start in itertools.islice(starts, 1):
+                parts.append(pool.submit(fetch, start))
+            lines = data.split(b'\n')
+            tail = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield _loads(line)
+        if tail.strip():
+            yield _loads(tail)
+
+def iter_corpus_local(file_path: str) -> Iterator[Dict]:
+    """Stream preprocessed corpus chunks from a local file"""
+    logger.info(f"Loading from {file_path}")
+    
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield _loads(line)
+
+def iter_corpus(sources: List[str]) -> Iterator[Dict]:
+    """Stream chunks from several S3 or local JSONL sources in order"""
+    for source in sources:
+        if source.startswith('s3://'):
+            bucket, key = source.replace('s3://', '').split('/', 1)
+            yield from iter_corpus_s3(bucket, key)
+        else:
+            yield from iter_corpus_local(source)
+
+def count_corpus_local(file_path: str) -> int:
+    """Count non-empty lines without parsing them, for progress estimates"""
+    with open(file_path, 'rb') as f:
+        return sum(1 for line in f if line.strip())
 
 def load_corpus_from_s3(bucket: str, key: str) -> List[Dict]:
     """Load preprocessed corpus from S3"""
-    s3 = boto3.client('s3')
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    corpus = []
-    
-    for line in obj['Body'].iter_lines():
-        if line:
-            corpus.append(json.loads(line))
-    
+    corpus = list(iter_corpus_s3(bucket, key))
     logger.info(f"Loaded {len(corpus)} chunks from S3")
     return corpus
 
 def load_corpus_from_local(file_path: str) -> List[Dict]:
     """Load preprocessed corpus from local file"""
-    logger.info(f"Loading from {file_path}")
-    
-    corpus = []
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line.strip():
-                corpus.append(json.loads(line))
-    
+    corpus = list(iter_corpus_local(file_path))
     logger.info(f"Loaded {len(corpus)} chunks from local file")
     return corpus
 
-def main():
+class EmbeddingCache:
+    """
+    On-disk embedding store keyed by a BLAKE2b digest of endpoint and text
+
+    Persists across runs so repeated passages, within a corpus or between
+    rebuilds, are embedded only once. Vectors are stored as float32 bytes.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint_name: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{endpoint_name}\0{text}".encode('utf-8'), digest_size=16).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """Return the cached vectors for whichever keys are present"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start+500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for key, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, entries: Dict[bytes, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array('f', vector).tobytes()) for key, vector in entries.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def embed_batch(batch: List[Dict], generate: Callable[[List[str]], List[List[float]]], cache_namespace: str,
+                cache: Optional[EmbeddingCache] = None) -> Tuple[List[Dict], List[List[float]]]:
+    """Embed the items of one corpus batch that have text, returning those items and their vectors"""
+    items = []
+    for item in batch:
+        if not item.get('text', ''):
+            logger.warning(f"Skipping item without text: {item.get('id', 'unknown')}")
+            continue
+        items.append(item)
+
+    if not items:
+        return items, []
+
+    texts = [item['text'] for item in items]
+    if cache is None:
+        logger.debug(f"Generating embeddings for {len(texts)} texts...")
+        return items, generate(texts)
+
+    # Only texts missing from the cache, each once, go to the endpoint
+    keys = [EmbeddingCache.key(cache_namespace, text) for text in texts]
+    vectors = cache.get_many(list(set(keys)))
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors:
+            missing.setdefault(key, text)
+
+    if missing:
+        logger.debug(f"Generating embeddings for {len(missing)} of {len(texts)} texts...")
+        embeddings = generate(list(missing.values()))
+        fresh = {key: embedding for key, embedding in zip(missing, embeddings) if embedding}
+        cache.put_many(fresh)
+        vectors.update(fresh)
+
+    return items, [vectors.get(key, []) for key in keys]
+
+def build_passages(offset: int, items: List[Dict], embeddings: List[List[float]]) -> List[Dict]:
+    """Pair items with their embeddings as index documents"""
+    passages = []
+    for idx, (item, embedding) in enumerate(zip(items, embeddings)):
+        metadata = item.get('metadata', {})
+        chunk_id = metadata.get('chunk_id', idx)
+        # Fallback ids come from the batch offset so they don't depend on completion order
+        doc_id = metadata.get('id', f"doc_{offset + idx}")
+
+        passages.append({
+            'id': f"{doc_id}_chunk_{chunk_id}",
+            'embedding': embedding,
+            'text': item.get('text', ''),
+            'metadata': metadata
+        })
+    return passages
+
+def main(argv=None):
     """Main indexing job"""
     parser = argparse.ArgumentParser(description='Build OpenSearch Vector Index')
     parser.add_argument('--source', required=True, 
-                       help='Source data (S3 path s3://bucket/key or local file path)')
+                       help='Source data: comma-separated S3 paths (s3://bucket/key) and/or local file paths')
     parser.add_argument('--index-name', default='ethical-knowledge',
                        help='OpenSearch index name')
     parser.add_argument('--batch-size', type=int, default=50,
@@ -99,116 +425,191 @@ def main():
     parser.add_argument('--opensearch-endpoint',
                        default=None,
                        help='OpenSearch endpoint URL')
+    parser.add_argument('--number-of-shards', type=int, default=3,
+                       help='Primary shards for a newly created index; changing it later requires reindexing')
     parser.add_argument('--embedding-endpoint',
                        default=None,
-                       help='SageMaker embedding endpoint name')
+                       help='SageMaker embedding endpoint name (with the local backend, only used to verify the model)')
+    parser.add_argument('--embedding-backend', default='sagemaker', choices=['sagemaker', 'local'],
+                       help='Embed on the SageMaker endpoint or in-process on a local GPU')
+    parser.add_argument('--local-model', default=None,
+                       help='sentence-transformers model for the local backend (required with it); checked against '
+                            '--embedding-endpoint on probe passages and refused unless it reproduces its embeddings')
+    parser.add_argument('--local-device', default='cuda',
+                       help='Torch device for the local backend')
+    parser.add_argument('--max-inflight', type=int, default=4,
+                       help='Embedding batches requested concurrently')
+    parser.add_argument('--embed-cache', default='data/embed_cache/embeddings.sqlite3',
+                       help='Embedding cache database reused across runs (empty to disable)')
+    parser.add_argument('--request-size', type=int, default=10,
+                       help='Texts per embedding request; smaller concurrent requests let the endpoint batch them on the GPU')
+    parser.add_argument('--autotune', action=argparse.BooleanOptionalAction, default=True,
+                       help='Probe request sizes up to --batch-size and use the fastest instead of --request-size')
+    parser.add_argument('--autotune-max-latency', type=float, default=None,
+                       help='Latency cap in seconds for autotuned embedding requests')
+    parser.add_argument('--index-concurrency', type=int, default=min(8, os.cpu_count() or 1),
+                       help='Concurrent OpenSearch bulk requests per batch')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Initialize clients
     logger.info("Initializing clients...")
 
     # Check required parameters
-    if not args.embedding_endpoint:
+    embedder = None
+    if args.embedding_backend == 'local':
+        if not args.local_model:
+            logger.error("Local embedding model is required with --embedding-backend local (--local-model)")
+            return
+        if not args.embedding_endpoint:
+            logger.error("The query-time endpoint is required to verify the local model (--embedding-endpoint)")
+            return
+        logger.info(f"Loading local embedding model {args.local_model} on {args.local_device}")
+        embedder = LocalEmbedder(args.local_model, device=args.local_device)
+        similarity = check_embedding_parity(embedder, args.embedding_endpoint)
+        if similarity < _MIN_PARITY_SIMILARITY:
+            logger.error(f"Local model {args.local_model} does not reproduce {args.embedding_endpoint} embeddings "
+                         f"(lowest probe cosine similarity {similarity:.4f}, need {_MIN_PARITY_SIMILARITY})")
+            return
+        logger.info(f"Local model matches the endpoint (lowest probe cosine similarity {similarity:.4f})")
+        # Namespaces cached vectors by model, as the endpoint name does for remote embeddings
+        embedding_source = f"local:{args.local_model}"
+    elif not args.embedding_endpoint:
         logger.error("Embedding endpoint is required (--embedding-endpoint)")
         return
+    else:
+        embedding_source = args.embedding_endpoint
 
     # Initialize vector store
     if args.opensearch_endpoint:
         os.environ['OPENSEARCH_ENDPOINT'] = args.opensearch_endpoint
 
-    vector_store = VectorStore()
+    vector_store = VectorStore(pool_maxsize=max(10, args.index_concurrency), number_of_shards=args.number_of_shards)
     
     # Create index
     logger.info(f"Creating OpenSearch index: {args.index_name}")
     vector_store.index_name = args.index_name
     vector_store.create_index()
     
-    # Load corpus (from S3 or local file)
-    if args.source.startswith('s3://'):
-        bucket, key = args.source.replace('s3://', '').split('/', 1)
-        corpus = load_corpus_from_s3(bucket, key)
+    # Stream corpus (from S3 or local files) so batches start before it is fully read.
+    # Only local files can be counted cheaply up front for the ETA.
+    sources = [source.strip() for source in args.source.split(',') if source.strip()]
+    corpus = iter_corpus(sources)
+    if any(source.startswith('s3://') for source in sources):
+        total = None
     else:
-        corpus = load_corpus_from_local(args.source)
-    
-    if not corpus:
-        logger.error("No corpus loaded. Exiting.")
-        return
+        total = sum(count_corpus_local(source) for source in sources)
     
     # Process in batches
     batch_size = args.batch_size
-    total_batches = (len(corpus) + batch_size - 1) // batch_size
+    total_batches = (total + batch_size - 1) // batch_size if total is not None else None
+    seen = 0
     processed = 0
     failed = 0
     
     start_time = time.time()
     
-    for i in range(0, len(corpus), batch_size):
-        batch = corpus[i:i+batch_size]
-        batch_num = i // batch_size + 1
-        
-        logger.info(f"Processing batch {batch_num}/{total_batches} ({len(batch)} chunks)")
-        
+    def index_done(batch_num: int, size: int, future):
+        """Record the outcome of one bulk insert"""
+        nonlocal processed, failed
         try:
-            # Extract text for embedding
-            texts = []
-            for item in batch:
-                text = item.get('text', '')
-                if not text:
-                    logger.warning(f"Skipping item without text: {item.get('id', 'unknown')}")
-                    continue
-                texts.append(text)
-            
-            if not texts:
-                logger.warning("No valid texts in batch, skipping")
-                continue
-            
-            # Generate embeddings using NIM
-            logger.debug(f"Generating embeddings for {len(texts)} texts...")
-            embeddings = generate_embeddings_nim(texts, args.embedding_endpoint, batch_size=10)
-            
-            if len(embeddings) != len(texts):
-                logger.error(f"Embedding count mismatch: got {len(embeddings)}, expected {len(texts)}")
-                failed += len(texts)
-                continue
-            
-            # Prepare passages with embeddings
-            passages = []
-            for idx, (item, embedding) in enumerate(zip(batch, embeddings)):
-                chunk_id = item.get('metadata', {}).get('chunk_id', idx)
-                doc_id = item.get('metadata', {}).get('id', f"doc_{processed + idx}")
-                
-                passage = {
-                    'id': f"{doc_id}_chunk_{chunk_id}",
-                    'embedding': embedding,
-                    'text': item.get('text', ''),
-                    'metadata': item.get('metadata', {})
-                }
-                passages.append(passage)
-            
-            # Insert into OpenSearch
-            if passages:
-                success = vector_store.bulk_insert(passages)
-                processed += len(passages)
-                logger.info(f"✓ Indexed batch {batch_num} ({processed}/{len(corpus)} total)")
-            
+            indexed = future.result()
+            processed += indexed
+            failed += size - indexed
+            logger.info(f"✓ Indexed batch {batch_num} ({processed}/{total or seen} total)")
         except Exception as e:
             logger.error(f"Error processing batch {batch_num}: {e}")
-            failed += len(batch)
-            continue
-        
+            failed += size
+            return
+
         # Progress update
+        if total_batches is None:
+            logger.info(f"Progress: {processed}/{seen} indexed | Failed: {failed}")
+            return
+
         elapsed = time.time() - start_time
         avg_time_per_batch = elapsed / batch_num if batch_num > 0 else 0
         remaining_batches = total_batches - batch_num
         eta_seconds = avg_time_per_batch * remaining_batches
-        
-        logger.info(f"Progress: {processed}/{len(corpus)} indexed "
+
+        logger.info(f"Progress: {processed}/{total} indexed "
                    f"| ETA: {int(eta_seconds)}s | Failed: {failed}")
+
+    def embedding_done(offset: int, batch: List[Dict], future):
+        """Hand a finished embedding batch to the indexer"""
+        nonlocal failed
+        batch_num = offset // batch_size + 1
+        try:
+            items, embeddings = future.result()
+        except Exception as e:
+            logger.error(f"Error processing batch {batch_num}: {e}")
+            failed += len(batch)
+            return
+
+        if not items:
+            logger.warning("No valid texts in batch, skipping")
+            return
+
+        if len(embeddings) != len(items):
+            logger.error(f"Embedding count mismatch: got {len(embeddings)}, expected {len(items)}")
+            failed += len(items)
+            return
+
+        passages = build_passages(offset, items, embeddings)
+        indexing.append((batch_num, len(passages), index_pool.submit(vector_store.bulk_insert, passages, args.index_concurrency)))
+
+        # Keep at most one insert queued behind the running one
+        while len(indexing) > 1 and indexing[0][2].done() or len(indexing) > 2:
+            index_done(*indexing.popleft())
+
+    cache = EmbeddingCache(args.embed_cache) if args.embed_cache else None
+    # The backend is bound once here, so the batch loop calls a single embedding function
+    if embedder is not None:
+        generate = embedder.encode
+    else:
+        tuner = RequestSizeTuner(batch_size, max_latency=args.autotune_max_latency) if args.autotune else None
+        generate = functools.partial(
+            generate_embeddings_nim,
+            endpoint_name=args.embedding_endpoint,
+            batch_size=args.request_size,
+            tuner=tuner
+        )
+
+    # Embedding requests for several batches are in flight at once while the previous
+    # batch is being inserted; batches are handed to the indexer in corpus order.
+    embedding = deque()
+    indexing = deque()
+    try:
+        # Ingest without refreshes or replicas; settings are restored and segments merged afterwards
+        with vector_store.bulk_load(), \
+                ThreadPoolExecutor(max_workers=args.max_inflight) as embed_pool, \
+                ThreadPoolExecutor(max_workers=1) as index_pool:
+            while True:
+                batch = list(itertools.islice(corpus, batch_size))
+                if not batch:
+                    break
+                i = seen
+                seen += len(batch)
+                logger.info(f"Processing batch {i // batch_size + 1}/{total_batches or '?'} ({len(batch)} chunks)")
+                embedding.append((i, batch, embed_pool.submit(embed_batch, batch, generate, embedding_source, cache)))
+
+                if len(embedding) >= args.max_inflight:
+                    embedding_done(*embedding.popleft())
+
+            while embedding:
+                embedding_done(*embedding.popleft())
+            while indexing:
+                index_done(*indexing.popleft())
+    finally:
+        if cache is not None:
+            cache.close()
+    if not seen:
+        logger.error("No corpus loaded. Exiting.")
+        return
     
     total_time = time.time() - start_time
     logger.info(f"✓ Vector index build complete!")
-    logger.info(f"  Total chunks: {len(corpus)}")
+    logger.info(f"  Total chunks: {seen}")
     logger.info(f"  Successfully indexed: {processed}")
     logger.info(f"  Failed: {failed}")
     logger.info(f"  Time elapsed: {int(total_time)}s")
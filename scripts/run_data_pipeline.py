@@ -3,33 +3,51 @@ Complete Data Pipeline Orchestrator
 Runs: Scraping → Curator → Preprocessing → Vector Indexing
 """
 import argparse
+import importlib.util
 import logging
-import subprocess
 import sys
 from pathlib import Path
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_command(cmd: list, description: str):
-    """Run a shell command"""
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Stage modules are loaded once and reused, so imports like spaCy and boto3 are paid once per run
+_stage_modules = {}
+
+def _load_stage(script: str):
+    """Import a pipeline script by its repo-relative path"""
+    module = _stage_modules.get(script)
+    if module is None:
+        if str(REPO_ROOT) not in sys.path:
+            sys.path.insert(0, str(REPO_ROOT))
+        spec = importlib.util.spec_from_file_location(Path(script).stem, REPO_ROOT / script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _stage_modules[script] = module
+    return module
+
+def run_stage(script: str, argv: list, description: str):
+    """Run a pipeline script's main() in-process"""
     logger.info(f"Running: {description}")
-    logger.debug(f"Command: {' '.join(cmd)}")
+    logger.debug(f"Stage: {script} {' '.join(argv)}")
     
     try:
-        result = subprocess.run(
-            cmd,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+        _load_stage(script).main(argv)
         logger.info(f"✓ {description} completed successfully")
-        if result.stdout:
-            logger.debug(result.stdout)
         return True
-    except subprocess.CalledProcessError as e:
+    except SystemExit as e:
+        # argparse and explicit exits still report success through a zero code
+        if not e.code:
+            logger.info(f"✓ {description} completed successfully")
+            return True
         logger.error(f"✗ {description} failed")
-        logger.error(f"Error: {e.stderr}")
+        logger.error(f"Error: exited with status {e.code}")
+        return False
+    except Exception as e:
+        logger.error(f"✗ {description} failed")
+        logger.error(f"Error: {e}")
         return False
 
 def main():
@@ -66,23 +84,23 @@ def main():
         if args.sources in ['all', 'sep']:
             logger.info("\n=== Step 1a: Scraping Stanford SEP ===")
             sep_file = raw_dir / 'sep_articles.jsonl'
-            run_command(
-                ['python', 'data_acquisition/scrapers/sep_scraper.py'],
+            run_stage(
+                'data_acquisition/scrapers/sep_scraper.py', [],
                 'SEP scraping'
             )
         
         if args.sources in ['all', 'arxiv']:
             logger.info("\n=== Step 1b: Scraping arXiv ===")
-            run_command(
-                ['python', 'data_acquisition/scrapers/arxiv_scraper.py'],
+            run_stage(
+                'data_acquisition/scrapers/arxiv_scraper.py', [],
                 'arXiv scraping'
             )
         
         if args.sources in ['all', 'synthetic']:
             logger.info("\n=== Step 1c: Generating Synthetic Scenarios ===")
             synthetic_file = base_dir / 'synthetic_scenarios.jsonl'
-            run_command(
-                ['python', 'data_acquisition/synthetic_generator.py'],
+            run_stage(
+                'data_acquisition/synthetic_generator.py', [],
                 'Synthetic scenario generation'
             )
     
@@ -104,9 +122,9 @@ def main():
                 source_path = str(raw_file)
                 output_path = str(curated_file)
             
-            run_command(
-                ['python', 'data_acquisition/curator_pipeline.py',
-                 '--source', source_path,
+            run_stage(
+                'data_acquisition/curator_pipeline.py',
+                ['--source', source_path,
                  '--output', output_path,
                  '--min-quality', '60'],
                 f'Curation for {source}'
@@ -135,9 +153,9 @@ def main():
             output_path = str(processed_file)
         
         if args.s3_bucket or Path(source_path.replace('s3://', '')).exists():
-            run_command(
-                ['python', 'data_acquisition/preprocess.py',
-                 '--source', source_path,
+            run_stage(
+                'data_acquisition/preprocess.py',
+                ['--source', source_path,
                  '--output', output_path,
                  '--chunk-size', '500'],
                 f'Preprocessing for {curated_file.stem}'
@@ -147,46 +165,17 @@ def main():
     # Step 4: Vector Indexing
     logger.info("\n=== Step 4: Building Vector Index ===")
     
-    # Combine all processed files into one corpus
-    corpus_file = processed_dir / 'corpus.jsonl'
-    
-    logger.info(f"Combining {len(processed_files)} processed files into corpus...")
-    
-    with open(corpus_file, 'w') as outfile:
-        for proc_file in processed_files:
-            file_path = proc_file if not args.s3_bucket else None
-            
-            if args.s3_bucket:
-                # Download from S3 first
-                import boto3
-                s3 = boto3.client('s3')
-                bucket = args.s3_bucket
-                key = f"data-processed/{proc_file.name}"
-                
-                logger.info(f"Downloading s3://{bucket}/{key}")
-                obj = s3.get_object(Bucket=bucket, Key=key)
-                
-                for line in obj['Body'].iter_lines():
-                    if line:
-                        outfile.write(line.decode('utf-8') + '\n')
-            else:
-                # Read from local file
-                with open(file_path, 'r') as infile:
-                    for line in infile:
-                        if line.strip():
-                            outfile.write(line)
-    
-    logger.info(f"✓ Created corpus with combined data")
-    
-    # Build vector index
+    # The indexer streams every processed file in turn, so nothing is combined or downloaded here
     if args.s3_bucket:
-        source_path = f"s3://{args.s3_bucket}/data-processed/corpus.jsonl"
+        source_paths = [f"s3://{args.s3_bucket}/data-processed/{proc_file.name}" for proc_file in processed_files]
     else:
-        source_path = str(corpus_file)
+        source_paths = [str(proc_file) for proc_file in processed_files]
+    
+    logger.info(f"Indexing {len(source_paths)} processed files")
     
-    run_command(
-        ['python', 'scripts/build_vector_index.py',
-         '--source', source_path,
+    run_stage(
+        'scripts/build_vector_index.py',
+        ['--source', ','.join(source_paths),
          '--index-name', 'ethical-knowledge',
          '--batch-size', '50'],
         'Vector index building'
@@ -9,6 +9,7 @@ import os
 from typing import List, Dict
 
 # Import our services
+from services.embedding_codec import decode_embedding
 from services.opensearch_client import VectorStore
 
 logging.basicConfig(level=logging.INFO)
@@ -30,7 +31,8 @@ def test_embedding_generation(endpoint_name: str) -> List[float]:
         payload = {
             'input': test_texts,
             'model': 'nvidia/nv-embedqa-e5-v5',
-            'encoding_format': 'float'
+            # Same base64 float32 encoding the indexer requests, so its decoding is exercised too
+            'encoding_format': 'base64'
         }
 
         response = sagemaker.invoke_endpoint(
@@ -39,10 +41,10 @@ def test_embedding_generation(endpoint_name: str) -> List[float]:
             Body=json.dumps(payload)
         )
 
-        result = json.loads(response['Body'].read().decode('utf-8'))
+        result = json.loads(response['Body'].read())
 
         if 'data' in result and result['data']:
-            embedding = result['data'][0].get('embedding', [])
+            embedding = decode_embedding(result['data'][0].get('embedding', []))
             logger.info(f"✅ Embedding generated successfully: {len(embedding)} dimensions")
             return embedding
         else:
@@ -0,0 +1,18 @@
+"""
+Embedding Codec
+Decodes embeddings returned by NIM endpoints with encoding_format=base64
+"""
+from array import array
+from typing import List
+import base64
+import sys
+
+def decode_embedding(embedding) -> List[float]:
+    """Decode a base64 float32 embedding, passing through endpoints that still return lists"""
+    if isinstance(embedding, str):
+        vector = array('f')
+        vector.frombytes(base64.b64decode(embedding))
+        if sys.byteorder != 'little':
+            vector.byteswap()
+        return vector.tolist()
+    return embedding
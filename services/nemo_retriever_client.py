@@ -3,6 +3,7 @@ NeMo Retriever Client
 Wraps NeMo Retriever API for embedding generation and semantic search
 """
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict
 import logging
 import os
@@ -14,11 +15,32 @@ class NeMoRetrieverClient:
     def __init__(self, endpoint: str = None, api_key: str = None):
         self.endpoint = endpoint or os.getenv('NEMO_RETRIEVER_ENDPOINT')
         self.api_key = api_key or os.getenv('NGC_API_KEY')
+        self.model = "llama-3.2-nv-embedqa-1b-v2"
         
         if not self.endpoint:
             raise ValueError("NeMo Retriever endpoint not configured")
         if not self.api_key:
             raise ValueError("NGC API key not provided")
+        
+        # Keep-alive session so repeated batches reuse pooled TLS connections
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """
@@ -31,15 +53,11 @@ class NeMoRetrieverClient:
             List of embedding vectors (2048-dimensional)
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.endpoint}/v1/embeddings",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
                 json={
                     "input": texts,
-                    "model": "llama-3.2-nv-embedqa-1b-v2"
+                    "model": self.model
                 },
                 timeout=60
             )
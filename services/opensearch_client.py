@@ -2,37 +2,131 @@
 AWS OpenSearch Vector Store Client
 Handles k-NN search for semantic similarity
 """
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
-from typing import List, Dict
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from opensearchpy import OpenSearch, Urllib3AWSV4SignerAuth, Urllib3HttpConnection
+from opensearchpy.exceptions import RequestError, SerializationError, TransportError
+from opensearchpy.serializer import JSONSerializer
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Sized
 import boto3
-import os
 import logging
+import math
+import os
+import random
+import time
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to the client's stdlib json serializer if orjson is not installed
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    # Embeddings are then plain lists of floats
+    np = None
+
+# An embedding as a list of floats or a 1-D float NumPy array
+Vector = Sequence[float]
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonSerializer(JSONSerializer):
+    """Serialize request and response bodies with orjson, much faster on long float arrays"""
+
+    def dumps(self, data: Any) -> str:
+        # Pre-serialized bodies, such as joined bulk lines, pass through unchanged
+        if isinstance(data, str):
+            return data
+        try:
+            return orjson.dumps(data, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+        except TypeError as e:
+            raise SerializationError(data, e)
+
+    def loads(self, s: Any) -> Any:
+        try:
+            return orjson.loads(s)
+        except ValueError as e:
+            raise SerializationError(s, e)
+
+@lru_cache(maxsize=None)
+def _get_credentials():
+    """Refreshable AWS credentials, resolved once per process"""
+    return boto3.Session().get_credentials()
+
+def _check_vector(vector: Vector) -> Vector:
+    """Reject NumPy arrays the serializer would emit as something other than a flat float list"""
+    if np is not None and isinstance(vector, np.ndarray):
+        if vector.ndim != 1 or vector.dtype.kind != 'f':
+            raise ValueError(f"Embedding must be a 1-D float array, got {vector.dtype} with shape {vector.shape}")
+    return vector
+
+def normalize_l2(vector: Vector) -> Vector:
+    """Scale a vector to unit length, so inner product equals cosine similarity"""
+    if np is not None and isinstance(vector, np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+    norm = math.sqrt(sum(x * x for x in vector)) + 1e-12
+    return [x / norm for x in vector]
+
+def quantize_int8(vector: Vector) -> Vector:
+    """
+    Scale a vector into the signed byte range
+
+    Cosine similarity ignores vector length, so the per-vector scale does not
+    need to be stored for search.
+    """
+    if np is not None and isinstance(vector, np.ndarray):
+        peak = float(np.abs(vector).max(initial=0.0))
+        if not peak:
+            return np.zeros(len(vector), dtype=np.int8)
+        return np.rint(vector * (127.0 / peak)).astype(np.int8)
+    peak = max((abs(x) for x in vector), default=0.0)
+    if not peak:
+        return [0] * len(vector)
+    scale = 127.0 / peak
+    return [round(x * scale) for x in vector]
+
 class VectorStore:
-    def __init__(self, endpoint: str = None, region: str = 'us-east-1'):
+    def __init__(self, endpoint: str = None, region: str = 'us-east-1', pool_maxsize: int = None,
+                 vector_data_type: str = None, bulk_chunk_size: int = None,
+                 bulk_max_chunk_bytes: int = None, hnsw_m: int = 16, ef_construction: int = 256,
+                 ef_search: int = 100, number_of_shards: int = 3):
         self.endpoint = endpoint or os.getenv('OPENSEARCH_ENDPOINT')
         self.region = region
         self.index_name = 'ethical-knowledge'
+        # 'byte' stores int8-quantized vectors in a Lucene HNSW field, a quarter of the
+        # float payload; ingest and search must use the same setting as the index.
+        # 'fp16' keeps sending floats and lets faiss store them at half precision.
+        self.vector_data_type = vector_data_type or os.getenv('OPENSEARCH_VECTOR_DATA_TYPE', 'float')
+        self.quantize = self.vector_data_type == 'byte'
+        # Bulk requests hold up to this many documents, split further to stay under the byte
+        # limit; 10MB is the smallest http.max_content_length among managed instance types
+        self.bulk_chunk_size = bulk_chunk_size or int(os.getenv('OPENSEARCH_BULK_CHUNK_SIZE', 1000))
+        self.bulk_max_chunk_bytes = bulk_max_chunk_bytes or int(os.getenv('OPENSEARCH_BULK_MAX_CHUNK_BYTES', 10 * 1024 * 1024))
+        # HNSW graph parameters, applied when the index is created. Higher m and
+        # ef_construction raise recall at the cost of memory and build time;
+        # ef_search trades query latency for recall at search time.
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        # Fixed when the index is created; changing it means reindexing
+        self.number_of_shards = number_of_shards
+        # Attempts for requests rejected by a throttled or overloaded cluster
+        self.max_attempts = 5
         
         if not self.endpoint:
             raise ValueError("OpenSearch endpoint not configured")
         
         # Get AWS credentials from environment or instance metadata
-        session = boto3.Session()
-        credentials = session.get_credentials()
+        credentials = _get_credentials()
         
         if credentials:
-            awsauth = AWS4Auth(
-                credentials.access_key,
-                credentials.secret_key,
-                self.region,
-                'es',
-                session_token=credentials.token
-            )
+            # Signs each request with the current credentials, so refreshed role credentials are picked up
+            awsauth = Urllib3AWSV4SignerAuth(credentials, self.region, 'es')
         else:
             # Fallback to unsigned requests if using IAM role
             awsauth = None
@@ -42,34 +136,106 @@ class VectorStore:
             http_auth=awsauth,
             use_ssl=True,
             verify_certs=True,
-            connection_class=RequestsHttpConnection,
+            # urllib3 keeps pooled connections alive with less per-request overhead than requests
+            connection_class=Urllib3HttpConnection,
             timeout=30,
             max_retries=3,
-            retry_on_timeout=True
+            retry_on_timeout=True,
+            # Enough pooled connections for concurrent bulk indexing and search threads
+            maxsize=pool_maxsize or max(32, (os.cpu_count() or 1) * 4),
+            # Gzip request bodies; bulk payloads of JSON floats shrink several-fold on the wire
+            http_compress=True,
+            serializer=OrjsonSerializer() if orjson is not None else JSONSerializer()
         )
     
+    @classmethod
+    @lru_cache(maxsize=None)
+    def from_cached(cls, endpoint: str = None, region: str = 'us-east-1') -> 'VectorStore':
+        """
+        Shared store per endpoint and region, reusing its client and connection pool
+
+        Callers must not change settings such as index_name on the shared instance.
+        """
+        return cls(endpoint=endpoint, region=region)
+    
+    def _embedding_mapping(self) -> Dict:
+        """k-NN field mapping for the configured vector data type"""
+        if self.quantize:
+            return {
+                "type": "knn_vector",
+                "dimension": 1024,
+                "data_type": "byte",
+                "method": {
+                    "name": "hnsw",
+                    "space_type": "cosinesimil",
+                    "engine": "lucene",
+                    "parameters": self._hnsw_parameters()
+                }
+            }
+        return {
+            "type": "knn_vector",
+            "dimension": 1024,  # E5-v5 models produce 1024-dimensional embeddings
+            "method": {
+                "name": "hnsw",
+                # Vectors are normalized client-side, so inner product ranks like cosine
+                # without the per-comparison normalization
+                "space_type": "innerproduct",
+                # Faiss uses SIMD distance kernels
+                "engine": "faiss",
+                "parameters": self._hnsw_parameters()
+            }
+        }
+    
+    def _hnsw_parameters(self) -> Dict:
+        """HNSW graph construction parameters"""
+        parameters = {
+            "m": self.hnsw_m,
+            "ef_construction": self.ef_construction
+        }
+        if self.vector_data_type == 'fp16':
+            # Scalar quantization halves vector memory without a trained codebook
+            parameters["encoder"] = {
+                "name": "sq",
+                "parameters": {"type": "fp16"}
+            }
+        return parameters
+    
+    def _prepare_vector(self, vector: Vector) -> Vector:
+        """Convert an embedding to the representation stored in the index"""
+        # len() rather than truthiness, so NumPy vectors are accepted as well as lists
+        if vector is None or not len(vector):
+            return vector
+        _check_vector(vector)
+        if self.quantize:
+            return quantize_int8(vector)
+        return normalize_l2(vector)
+    
+    def _cluster_version(self) -> tuple:
+        """OpenSearch version of the cluster as a (major, minor) tuple"""
+        number = self.client.info()['version']['number']
+        return tuple(int(part) for part in number.split('-')[0].split('.')[:2])
+    
     def create_index(self):
         """Create OpenSearch index with k-NN mapping"""
+        version = self._cluster_version()
+        if self.vector_data_type == 'fp16' and version < (2, 13):
+            raise ValueError(f"fp16 vectors need the faiss sq encoder from OpenSearch 2.13, cluster runs {version}")
+        index_settings = {
+            "knn": True,
+            "knn.algo_param.ef_search": self.ef_search,
+            "number_of_shards": self.number_of_shards,
+            "number_of_replicas": 1
+        }
+        if version >= (2, 12):
+            # Searches each shard's segments in parallel; the setting is rejected before 2.12
+            index_settings["search.concurrent_segment_search.enabled"] = True
         index_body = {
             "settings": {
-                "index": {
-                    "knn": True,
-                    "knn.space_type": "cosinesimilarity",
-                    "number_of_shards": 3,
-                    "number_of_replicas": 1
-                }
+                "index": index_settings
             },
             "mappings": {
                 "properties": {
-                    "embedding": {
-                        "type": "knn_vector",
-                        "dimension": 1024,  # E5-v5 models produce 1024-dimensional embeddings
-                        "method": {
-                            "name": "hnsw",
-                            "space_type": "cosinesimilarity",
-                            "engine": "nmslib"
-                        }
-                    },
+                    "embedding": self._embedding_mapping(),
                     "text": {
                         "type": "text"
                     },
@@ -81,59 +247,225 @@ class VectorStore:
         }
         
         try:
-            self.client.indices.create(
-                index=self.index_name,
-                body=index_body,
-                ignore=400  # Ignore 400 if index already exists
-            )
-            logger.info(f"Index {self.index_name} created or already exists")
+            self.client.indices.create(index=self.index_name, body=index_body)
+            logger.info(f"Index {self.index_name} created")
+            return
+        except RequestError as e:
+            # Other 400s, such as settings or encoders an older domain does not support, are real failures
+            if e.error != 'resource_already_exists_exception':
+                logger.error(f"Error creating index: {e}")
+                raise
+            logger.info(f"Index {self.index_name} already exists")
         except Exception as e:
             logger.error(f"Error creating index: {e}")
             raise
+        self._check_embedding_mapping()
     
-    def bulk_insert(self, passages: List[Dict]):
+    def _check_embedding_mapping(self):
         """
-        Insert multiple passages with embeddings into index
+        Refuse an existing index whose vector field scores differently than this store expects
         
-        Args:
-            passages: List of dicts with 'embedding', 'text', 'metadata'
+        Space type and engine cannot be changed in place, and search scores are
+        mapped back to [0, 1] assuming the current mapping, so an index built
+        with another layout must be reindexed.
         """
-        from opensearchpy import helpers
+        response = self.client.indices.get_mapping(index=self.index_name)
+        # Keyed by the concrete index name, which differs from index_name behind an alias
+        mapping = next(iter(response.values()), {})
+        field = mapping.get('mappings', {}).get('properties', {}).get('embedding', {})
+        expected = self._embedding_mapping()
+        existing_layout = (field.get('data_type', 'float'), field.get('method', {}).get('space_type'),
+                           field.get('method', {}).get('engine'))
+        expected_layout = (expected.get('data_type', 'float'), expected['method']['space_type'],
+                           expected['method']['engine'])
+        if existing_layout != expected_layout:
+            raise ValueError(
+                f"Index {self.index_name} stores embeddings as {existing_layout} but {expected_layout} "
+                f"is expected; delete the index and rebuild it"
+            )
+    
+    def begin_bulk_load(self):
+        """
+        Relax index settings for a large ingest
         
-        actions = []
-        for i, passage in enumerate(passages):
+        Disables refresh and replicas and makes the translog async, so vectors
+        are written without rebuilding searchable segments after every batch.
+        Pair with end_bulk_load once the ingest finishes.
+        """
+        self.client.indices.put_settings(
+            index=self.index_name,
+            body={
+                "index": {
+                    "refresh_interval": "-1",
+                    "number_of_replicas": 0,
+                    "translog.durability": "async",
+                    # Fewer translog flushes while segments are only written, never refreshed
+                    "translog.flush_threshold_size": "1gb"
+                }
+            }
+        )
+        logger.info(f"Index {self.index_name} prepared for bulk load")
+    
+    def end_bulk_load(self, number_of_replicas: int = 1, merge_timeout: int = 3600):
+        """Restore normal index settings and merge segments so k-NN graphs are built once"""
+        self.client.indices.put_settings(
+            index=self.index_name,
+            body={
+                "index": {
+                    "refresh_interval": "1s",
+                    "number_of_replicas": number_of_replicas,
+                    "translog.durability": "request",
+                    "translog.flush_threshold_size": "512mb"
+                }
+            }
+        )
+        self.client.indices.refresh(index=self.index_name)
+        self.client.indices.forcemerge(
+            index=self.index_name,
+            max_num_segments=1,
+            request_timeout=merge_timeout
+        )
+        logger.info(f"Index {self.index_name} restored and merged after bulk load")
+    
+    @contextmanager
+    def bulk_load(self, number_of_replicas: int = 1, merge_timeout: int = 3600):
+        """Hold bulk load settings for the duration of a block, restoring them even on failure"""
+        self.begin_bulk_load()
+        try:
+            yield self
+        finally:
+            self.end_bulk_load(number_of_replicas=number_of_replicas, merge_timeout=merge_timeout)
+    
+    def _iter_actions(self, passages: Iterable[Dict]) -> Iterator[Dict]:
+        """Build bulk index actions lazily as the helpers consume them"""
+        for passage in passages:
             action = {
                 "_index": self.index_name,
-                "_id": passage.get('id', f"doc_{i}"),
                 "_source": {
-                    "embedding": passage.get('embedding'),
+                    "embedding": self._prepare_vector(passage.get('embedding')),
                     "text": passage.get('text'),
                     "metadata": passage.get('metadata', {})
                 }
             }
-            actions.append(action)
+            # Without a caller id the cluster assigns one, spread evenly across shards;
+            # such inserts are not idempotent, so resending them would duplicate documents
+            if passage.get('id') is not None:
+                action["_id"] = passage['id']
+            yield action
+    
+    def _retry_transient(self, func, *args, **kwargs):
+        """
+        Call func, retrying throttling and overload errors with jittered backoff
+        
+        Only 429/503 responses are retried; other errors, including other 4xx
+        responses, are raised immediately. Timeouts are already retried by the
+        client transport.
+        """
+        for attempt in range(self.max_attempts):
+            try:
+                return func(*args, **kwargs)
+            except TransportError as e:
+                if e.status_code not in (429, 503) or attempt == self.max_attempts - 1:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"Transient OpenSearch error, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+    
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Full-jitter exponential backoff, capped at five seconds"""
+        return random.uniform(0, min(5.0, 0.1 * (2 ** attempt)))
+    
+    def _parallel_bulk(self, passages: Iterable[Dict], thread_count: int) -> int:
+        """
+        Send passages as concurrent bulk requests, counting per-document results
+        
+        Documents rejected with 429 by a throttled cluster are resent with
+        jittered backoff; other per-document failures are counted and logged.
+        """
+        from opensearchpy import helpers
+        
+        chunk_size = self.bulk_chunk_size
+        if isinstance(passages, Sized):
+            # Shard-side document parsing parallelizes across concurrent bulk requests,
+            # so split even small batches across all threads
+            chunk_size = min(chunk_size, max(1, -(-len(passages) // thread_count)))
+        success = 0
+        failed = 0
+        first_error = None
+        actions = self._iter_actions(passages)
+        for attempt in range(self.max_attempts):
+            # Results come back in submission order, so each one pairs with the oldest sent action
+            sent = deque()
+            
+            def track(pending):
+                for action in pending:
+                    sent.append(action)
+                    yield action
+            
+            throttled = []
+            # Per-document failures are counted instead of aborting the remaining chunks
+            for ok, info in helpers.parallel_bulk(
+                self.client, track(actions), thread_count=thread_count, chunk_size=chunk_size,
+                max_chunk_bytes=self.bulk_max_chunk_bytes, raise_on_error=False
+            ):
+                action = sent.popleft()
+                if ok:
+                    success += 1
+                elif attempt < self.max_attempts - 1 and next(iter(info.values()), {}).get('status') == 429:
+                    throttled.append(action)
+                else:
+                    failed += 1
+                    if first_error is None:
+                        first_error = info
+            if not throttled:
+                break
+            delay = self._backoff_delay(attempt)
+            logger.warning(f"{len(throttled)} documents rejected by a throttled cluster, resending in {delay:.2f}s")
+            time.sleep(delay)
+            actions = throttled
+        logger.info(f"Bulk insert: {success} succeeded, {failed} failed")
+        if first_error is not None:
+            logger.warning(f"First bulk insert failure: {first_error}")
+        return success
+    
+    def bulk_insert(self, passages: Iterable[Dict], thread_count: int = 1):
+        """
+        Insert multiple passages with embeddings into index
+        
+        Args:
+            passages: Passages, or a stream of them, with 'embedding' (list or NumPy array), 'text',
+                'metadata' and optionally a stable 'id'; passages without one get a cluster-assigned id
+            thread_count: Concurrent bulk requests; above 1, chunks are sent in parallel
+        """
+        from opensearchpy import helpers
         
         try:
-            success, failed = helpers.bulk(self.client, actions, chunk_size=100)
+            if thread_count > 1:
+                if isinstance(passages, Sized) and all(passage.get('id') is not None for passage in passages):
+                    # A list can be resent whole; documents are indexed by id, so repeats are harmless
+                    return self._retry_transient(self._parallel_bulk, passages, thread_count)
+                return self._parallel_bulk(passages, thread_count)
+            
+            # Documents rejected with 429 are resent by the helper with exponential backoff
+            success, failed = helpers.bulk(
+                self.client, self._iter_actions(passages), chunk_size=self.bulk_chunk_size,
+                max_chunk_bytes=self.bulk_max_chunk_bytes,
+                max_retries=self.max_attempts - 1, initial_backoff=0.1, max_backoff=5
+            )
             logger.info(f"Bulk insert: {success} succeeded, {len(failed)} failed")
             return success
         except Exception as e:
             logger.error(f"Error in bulk insert: {e}")
             raise
     
-    def search_similar(self, query_embedding: List[float], top_k: int = 10) -> List[Dict]:
-        """
-        Search for similar passages using k-NN
-        
-        Args:
-            query_embedding: Query embedding vector
-            top_k: Number of results to return
-            
-        Returns:
-            List of similar documents
-        """
-        query = {
+    @staticmethod
+    def _knn_query(query_embedding: Vector, top_k: int) -> Dict:
+        """Build a k-NN query body for one embedding"""
+        return {
             "size": top_k,
+            # Stored vectors are not needed by callers; leave them out of the response
+            "_source": {"excludes": ["embedding"]},
             "query": {
                 "knn": {
                     "embedding": {
@@ -143,25 +475,91 @@ class VectorStore:
                 }
             }
         }
+    
+    # Only the fields _parse_hits reads come back, without shard and timing metadata
+    _HIT_FIELDS = ['hits.hits._id', 'hits.hits._score', 'hits.hits._source']
+    
+    def _similarity_score(self, score: float) -> float:
+        """Map an inner product score back onto the [0, 1] cosine score scale"""
+        if self.quantize:
+            return score
+        # Faiss scores inner product as 1 + ip when ip >= 0, else 1 / (1 - ip)
+        cosine = score - 1 if score >= 1 else 1 - 1 / score
+        return (1 + cosine) / 2
+    
+    def _parse_hits(self, response: Dict) -> List[Dict]:
+        """Convert a search response into result dicts"""
+        return [
+            {
+                'id': hit['_id'],
+                'text': hit['_source']['text'],
+                'metadata': hit['_source'].get('metadata', {}),
+                'score': self._similarity_score(hit['_score'])
+            }
+            # filter_path drops the hits key entirely when nothing matched
+            for hit in response.get('hits', {}).get('hits', [])
+        ]
+    
+    def search_similar(self, query_embedding: Vector, top_k: int = 10) -> List[Dict]:
+        """
+        Search for similar passages using k-NN
         
+        Args:
+            query_embedding: Query embedding vector, as a list or 1-D float NumPy array
+            top_k: Number of results to return
+            
+        Returns:
+            List of similar documents
+        """
         try:
-            response = self.client.search(
+            response = self._retry_transient(
+                self.client.search,
                 index=self.index_name,
-                body=query
+                body=self._knn_query(self._prepare_vector(query_embedding), top_k),
+                filter_path=self._HIT_FIELDS
+            )
+            return self._parse_hits(response)
+        
+        except Exception as e:
+            logger.error(f"Error in similarity search: {e}")
+            raise
+    
+    def search_similar_batch(self, query_embeddings: Sequence[Vector], top_k: int = 10) -> List[List[Dict]]:
+        """
+        Run several k-NN searches in a single _msearch round trip
+        
+        Args:
+            query_embeddings: Query embedding vectors
+            top_k: Number of results to return per query
+            
+        Returns:
+            One list of similar documents per query, in input order
+        """
+        if len(query_embeddings) == 0:
+            return []
+        
+        body = []
+        for query_embedding in query_embeddings:
+            body.append({"index": self.index_name})
+            body.append(self._knn_query(self._prepare_vector(query_embedding), top_k))
+        
+        try:
+            # status is kept so every query still has an entry, in order, when it has no hits
+            response = self._retry_transient(
+                self.client.msearch,
+                body=body,
+                filter_path=['responses.status', 'responses.error']
+                + [f"responses.{field}" for field in self._HIT_FIELDS]
             )
             
             results = []
-            for hit in response['hits']['hits']:
-                results.append({
-                    'id': hit['_id'],
-                    'text': hit['_source']['text'],
-                    'metadata': hit['_source'].get('metadata', {}),
-                    'score': hit['_score']
-                })
+            for item in response['responses']:
+                if 'error' in item:
+                    raise RuntimeError(item['error'])
+                results.append(self._parse_hits(item))
             
             return results
         
         except Exception as e:
-            logger.error(f"Error in similarity search: {e}")
+            logger.error(f"Error in batched similarity search: {e}")
             raise
-
@@ -0,0 +1,94 @@
+"""
+Vector index build tests
+Cover embedding request sizing and streamed S3 corpus reads
+"""
+import importlib.util
+import json
+import pathlib
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def build_vector_index(monkeypatch):
+    pytest.importorskip('boto3')
+    pytest.importorskip('opensearchpy')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    spec = importlib.util.spec_from_file_location('build_vector_index', ROOT / 'scripts' / 'build_vector_index.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    module._invoke_pool.shutdown(wait=False)
+
+
+def _probe_all(tuner, latencies):
+    for _ in latencies:
+        size, probe = tuner.next_size()
+        assert probe
+        tuner.record(size, size, latencies[size])
+
+
+def test_tuner_picks_highest_throughput(build_vector_index):
+    tuner = build_vector_index.RequestSizeTuner(max_size=32, candidates=(8, 16, 32, 64))
+
+    # Candidates larger than a corpus batch are never probed
+    assert tuner.candidates == [8, 16, 32]
+    _probe_all(tuner, {8: 1.0, 16: 1.0, 32: 4.0})
+    assert tuner.next_size() == (16, False)
+
+
+def test_tuner_respects_latency_cap(build_vector_index):
+    tuner = build_vector_index.RequestSizeTuner(max_size=32, candidates=(8, 16, 32), max_latency=2.0)
+    _probe_all(tuner, {8: 1.0, 16: 1.5, 32: 2.5})
+    assert tuner.best == 16
+
+    # With every size over the cap, the fastest request wins
+    tuner = build_vector_index.RequestSizeTuner(max_size=32, candidates=(8, 16, 32), max_latency=0.5)
+    _probe_all(tuner, {8: 1.0, 16: 1.5, 32: 2.5})
+    assert tuner.best == 8
+
+
+def test_tuner_requeues_and_reprobes(build_vector_index):
+    tuner = build_vector_index.RequestSizeTuner(max_size=16, candidates=(8, 16), reprobe_every=2)
+
+    size, _ = tuner.next_size()
+    tuner.requeue(size)
+    assert tuner.next_size() == (8, True)
+    tuner.record(8, 8, 1.0)
+    _probe_all(tuner, {16: 1.0})
+
+    assert tuner.next_size() == (16, False)
+    assert tuner.next_size() == (16, False)
+    assert tuner.next_size() == (8, True)
+
+
+def test_tuner_slices_requests_to_payload_limit(build_vector_index):
+    tuner = build_vector_index.RequestSizeTuner(max_size=8, max_payload_bytes=10)
+
+    assert tuner.slice_size(['aaaa', 'bbbb', 'cccc'], 0, 3) == 2
+    assert tuner.slice_size(['x' * 20, 'aaaa', 'bbbb', 'cccc'], 1, 3) == 2
+    # A single oversized text is still sent on its own
+    assert tuner.slice_size(['x' * 20], 0, 1) == 1
+
+
+def test_iter_corpus_s3_carries_lines_across_ranges(build_vector_index, monkeypatch):
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+    records = [{'id': i, 'text': 'chunk ' * i} for i in range(12)]
+    body = b'\n'.join(json.dumps(record).encode('utf-8') for record in records)
+
+    # Ranges much shorter than a line force carry-over through several parts
+    monkeypatch.setattr(build_vector_index, '_S3_PART_SIZE', 7)
+    monkeypatch.setattr(build_vector_index, '_S3_READ_AHEAD', 3)
+    with moto.mock_aws():
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket='corpus')
+        s3.put_object(Bucket='corpus', Key='chunks.jsonl', Body=body)
+        s3.put_object(Bucket='corpus', Key='trailing.jsonl', Body=body + b'\n\n')
+
+        assert list(build_vector_index.iter_corpus_s3('corpus', 'chunks.jsonl')) == records
+        assert list(build_vector_index.iter_corpus_s3('corpus', 'trailing.jsonl')) == records
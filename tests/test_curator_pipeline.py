@@ -0,0 +1,54 @@
+"""
+Curator pipeline tests
+Cover the JSONL stream that feeds multipart uploads
+"""
+import io
+import json
+
+import pytest
+
+pytest.importorskip('spacy')
+pytest.importorskip('boto3')
+
+DOCUMENTS = [
+    {'id': 'sep-1', 'content': 'Autonomy and consent'},
+    {'id': 'arxiv-2', 'content': 'Über die Würde — non-ASCII survives the split'},
+    {'id': 'empty', 'content': ''},
+]
+
+
+def _stream(documents):
+    from data_acquisition.curator_pipeline import _JsonlStream
+    return _JsonlStream(documents)
+
+
+@pytest.mark.parametrize('buffer_size', [1, 7, 1024 * 1024])
+def test_jsonl_stream_serializes_documents_on_demand(buffer_size):
+    stream = _stream(iter(DOCUMENTS))
+    data = io.BufferedReader(stream, buffer_size=buffer_size).read()
+
+    # Lines are separated, not terminated, so the object has no trailing newline
+    assert not data.endswith(b'\n')
+    assert [json.loads(line) for line in data.split(b'\n')] == DOCUMENTS
+    assert stream.count == len(DOCUMENTS)
+
+
+def test_jsonl_stream_fills_small_reads():
+    stream = _stream(DOCUMENTS[:1])
+    buffer = bytearray(5)
+    parts = []
+    while True:
+        size = stream.readinto(buffer)
+        if not size:
+            break
+        parts.append(bytes(buffer[:size]))
+
+    assert all(len(part) == 5 for part in parts[:-1])
+    assert json.loads(b''.join(parts)) == DOCUMENTS[0]
+
+
+def test_jsonl_stream_of_no_documents_is_empty():
+    stream = _stream([])
+
+    assert io.BufferedReader(stream).read() == b''
+    assert stream.count == 0
@@ -0,0 +1,80 @@
+"""
+Parallel bulk insert tests
+Drive VectorStore._parallel_bulk against a stub client that throttles some documents
+"""
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('opensearchpy')
+from opensearchpy.serializer import JSONSerializer
+
+from services.opensearch_client import VectorStore
+
+
+class _StubClient:
+    """Answers bulk requests per document from a status function, recording every send"""
+
+    def __init__(self, status):
+        self.transport = type('Transport', (), {'serializer': JSONSerializer()})()
+        self.status = status
+        self.sends = {}
+        self._lock = threading.Lock()
+
+    def bulk(self, body, **kwargs):
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        lines = body.splitlines() if isinstance(body, str) else body
+        items = []
+        # Action and source lines alternate; the id is on the action line
+        for action_line in lines[::2]:
+            doc_id = json.loads(action_line)['index']['_id']
+            with self._lock:
+                attempt = self.sends.get(doc_id, 0)
+                self.sends[doc_id] = attempt + 1
+            status = self.status(doc_id, attempt)
+            item = {'_id': doc_id, 'status': status}
+            if status >= 300:
+                item['error'] = {'type': 'stub_error'}
+            items.append({'index': item})
+        return {'errors': any(item['index']['status'] >= 300 for item in items), 'items': items}
+
+
+def _store(monkeypatch, status):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setattr(VectorStore, '_backoff_delay', staticmethod(lambda attempt: 0.0))
+    store = VectorStore(endpoint='https://search.example.test', bulk_chunk_size=3)
+    store.client = _StubClient(status)
+    return store
+
+
+def _passages(count):
+    return [{'id': str(i), 'text': f'passage {i}', 'embedding': [1.0, 0.0]} for i in range(count)]
+
+
+def test_throttled_documents_are_resent(monkeypatch):
+    # Every third document is throttled twice; document 7 is rejected outright
+    def status(doc_id, attempt):
+        if doc_id == '7':
+            return 400
+        if int(doc_id) % 3 == 0 and attempt < 2:
+            return 429
+        return 201
+
+    store = _store(monkeypatch, status)
+
+    assert store._parallel_bulk(_passages(10), thread_count=3) == 9
+    # Results are matched to the actions that produced them, so only throttled ones repeat
+    assert store.client.sends == {
+        str(i): 3 if i % 3 == 0 else 1 for i in range(10)
+    }
+
+
+def test_documents_throttled_on_every_attempt_are_counted_failed(monkeypatch):
+    store = _store(monkeypatch, lambda doc_id, attempt: 429 if doc_id == '1' else 201)
+    store.max_attempts = 2
+
+    assert store._parallel_bulk(_passages(4), thread_count=2) == 3
+    assert store.client.sends['1'] == 2
@@ -0,0 +1,90 @@
+"""
+Preprocessing pipeline tests
+Cover fan-out of duplicate documents to the chunks of the first copy
+"""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('spacy')
+pytest.importorskip('boto3')
+
+DOCUMENTS = [
+    {'id': 'a', 'source': 'sep', 'content': 'one two three four five'},
+    {'id': 'b', 'source': 'arxiv', 'content': 'six seven'},
+    # Same text as 'a' once whitespace is normalized
+    {'id': 'a-copy', 'source': 'pubmed', 'content': 'one  two three\nfour five'},
+    {'id': 'empty', 'content': ''},
+    {'id': 'a-again', 'source': 'sep', 'content': 'one two three four five'},
+]
+
+EXPECTED = [
+    ('a', 'one two'), ('a', 'three four'), ('a', 'five'),
+    ('b', 'six seven'),
+    ('a-copy', 'one two'), ('a-copy', 'three four'), ('a-copy', 'five'),
+    ('a-again', 'one two'), ('a-again', 'three four'), ('a-again', 'five'),
+]
+
+# Copies read while the original is still being parsed follow its chunks directly
+EXPECTED_IN_FLIGHT = EXPECTED[:3] + EXPECTED[4:] + EXPECTED[3:4]
+
+
+class _BatchingNLP:
+    """Reads every document before yielding any, like a batched multi-process pipe"""
+
+    pipe_names = []
+
+    def pipe(self, pairs, as_tuples, **kwargs):
+        batch = list(pairs)
+        for text, context in batch:
+            yield SimpleNamespace(text=text), context
+
+
+@pytest.fixture
+def preprocessor(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    from data_acquisition import preprocess
+    monkeypatch.setattr(preprocess, '_get_nlp', lambda: None)
+    return preprocess.DataPreprocessor(chunk_size=2, n_process=1)
+
+
+def _check_fan_out(chunks, expected):
+    assert [(chunk['metadata']['id'], chunk['text']) for chunk in chunks] == expected
+    by_id = {}
+    for chunk in chunks:
+        by_id.setdefault(chunk['metadata']['id'], []).append(chunk['metadata'])
+
+    # Copies keep their own document metadata but share the first copy's chunk metadata
+    assert by_id['a-copy'][0]['source'] == 'pubmed'
+    for copy_id in ('a-copy', 'a-again'):
+        for original, copy in zip(by_id['a'], by_id[copy_id]):
+            assert copy['chunk_id'] == original['chunk_id']
+            assert copy['preprocessed_at'] == original['preprocessed_at']
+
+
+def test_duplicates_reuse_processed_chunks(preprocessor):
+    _check_fan_out(list(preprocessor.iter_preprocess(DOCUMENTS)), EXPECTED)
+
+
+def test_duplicates_wait_for_in_flight_original(preprocessor, monkeypatch):
+    monkeypatch.setattr(preprocessor, 'nlp', _BatchingNLP())
+    monkeypatch.setattr(preprocessor, '_chunk_doc', lambda doc, metadata: preprocessor._simple_chunk(doc.text, metadata))
+
+    _check_fan_out(list(preprocessor.iter_preprocess(DOCUMENTS)), EXPECTED_IN_FLIGHT)
+
+
+def test_evicted_duplicates_are_reprocessed(preprocessor, monkeypatch):
+    chunked = []
+    simple_chunk = preprocessor._simple_chunk
+
+    def counting_chunk(text, metadata=None):
+        chunked.append(metadata['id'])
+        return simple_chunk(text, metadata)
+
+    monkeypatch.setattr(preprocessor, '_simple_chunk', counting_chunk)
+    preprocessor.dedupe_cache_size = 1
+    chunks = list(preprocessor.iter_preprocess(DOCUMENTS))
+
+    # 'b' evicted 'a', so 'a-copy' is chunked again; 'a-again' reuses its chunks
+    assert chunked == ['a', 'b', 'a-copy']
+    assert [(chunk['metadata']['id'], chunk['text']) for chunk in chunks] == EXPECTED
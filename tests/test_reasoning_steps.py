@@ -0,0 +1,75 @@
+"""
+Reasoning step parser tests
+Cover markdown the reasoning model commonly emits around numbered steps
+"""
+import importlib.util
+import pathlib
+
+import pytest
+
+RESPONSE = """**Ethical Analysis**
+
+1. **Stakeholders**: the patient,
+   the family and the hospital
+---
+2. Trade-offs between *autonomy* and __duty of care__
+- Outcome for the patient
+* Outcome for the hospital
+***
+"""
+
+EXPECTED = [
+    'Stakeholders: the patient, the family and the hospital',
+    'Trade-offs between autonomy and duty of care',
+    'Outcome for the patient',
+    'Outcome for the hospital',
+]
+
+# Asterisks and underscores that are not paired emphasis are step content
+LITERAL_RESPONSE = """1. Compute 2 * 3 and call __init__ here
+2. Pass f(*args, **kwargs) through
+"""
+
+LITERAL_EXPECTED = [
+    'Compute 2 * 3 and call __init__ here',
+    'Pass f(*args, **kwargs) through',
+]
+
+
+def test_agent_parser_ignores_emphasis_and_rules():
+    reasoning_engine = pytest.importorskip('agent.reasoning_engine')
+    parse = reasoning_engine.SynthArbiterAgent._parse_reasoning_steps
+
+    assert parse(None, RESPONSE) == EXPECTED
+    assert parse(None, "**Bold only**\n---") == ["**Bold only**\n---"]
+
+
+def test_agent_parser_keeps_literal_asterisks_and_dunders():
+    reasoning_engine = pytest.importorskip('agent.reasoning_engine')
+    parse = reasoning_engine.SynthArbiterAgent._parse_reasoning_steps
+
+    assert parse(None, LITERAL_RESPONSE) == LITERAL_EXPECTED
+
+
+def _load_analyze_lambda(monkeypatch):
+    pytest.importorskip('boto3')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    path = pathlib.Path(__file__).resolve().parents[1] / 'lambda' / 'analyze' / 'lambda_function.py'
+    spec = importlib.util.spec_from_file_location('analyze_lambda_function', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_lambda_parser_ignores_emphasis_and_rules(monkeypatch):
+    analyze = _load_analyze_lambda(monkeypatch)
+
+    assert analyze.parse_reasoning_steps(RESPONSE) == EXPECTED
+    assert len(analyze._STEP_START_RE.findall(RESPONSE)) == len(EXPECTED)
+    assert analyze.parse_reasoning_steps("**Bold only**\n---") == []
+
+
+def test_lambda_parser_keeps_literal_asterisks_and_dunders(monkeypatch):
+    analyze = _load_analyze_lambda(monkeypatch)
+
+    assert analyze.parse_reasoning_steps(LITERAL_RESPONSE) == LITERAL_EXPECTED